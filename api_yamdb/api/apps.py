@@ -4,3 +4,28 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import (m2m_changed, post_delete,
+                                              post_migrate, post_save)
+
+        from reviews.models import Review, Title
+        from .catalog import (CATALOGS, invalidate, invalidate_all,
+                              invalidate_titles)
+        from .db import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas)
+        for model in CATALOGS:
+            post_save.connect(invalidate, sender=model)
+            post_delete.connect(invalidate, sender=model)
+        # Review и так не удаляется быстрым DELETE из-за каскада
+        # на комментарии, поэтому сигналы не добавляют запросов.
+        for model in (Title, Review):
+            post_save.connect(invalidate_titles, sender=model)
+            post_delete.connect(invalidate_titles, sender=model)
+        m2m_changed.connect(invalidate_titles, sender=Title.genre.through)
+        # post_migrate отправляется только приложениям с моделями.
+        post_migrate.connect(
+            invalidate_all, sender=self.apps.get_app_config('reviews')
+        )
@@ -0,0 +1,156 @@
+"""
+Путь для ASGI: чтение (GET, HEAD, OPTIONS) представлений с
+async_reads = True выполняется в ограниченном пуле потоков
+ASYNC_READ_WORKERS, а не в единственном потоке, куда Django
+отправляет синхронные представления под ASGI. Запись по-прежнему
+идёт через sync_to_async(thread_sensitive=True).
+
+Маршруты для ASGI берутся из ASGI_URLCONF: это те же urlpatterns,
+где представления обёрнуты async_read_view, поэтому WSGI-воркеры
+работают с обычными синхронными представлениями.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import update_wrapper
+from typing import Callable, Dict, List
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.urls import URLPattern, URLResolver
+from rest_framework.permissions import SAFE_METHODS
+
+from .middleware import install_query_recorder
+
+# Пулы потоков по имени и настройке с числом потоков: чтение
+# и потоковые ответы (SSE), которые долго ждут событий и не должны
+# занимать потоки для чтения.
+POOLS: Dict[str, str] = {
+    'read': 'ASYNC_READ_WORKERS',
+    'stream': 'ASYNC_STREAM_WORKERS',
+}
+executors: Dict[str, ThreadPoolExecutor] = {}
+executors_lock = threading.Lock()
+
+
+def get_executor(name: str = 'read') -> ThreadPoolExecutor:
+    with executors_lock:
+        if name not in executors:
+            executors[name] = ThreadPoolExecutor(
+                max_workers=getattr(settings, POOLS[name]),
+                thread_name_prefix=f'api-{name}'
+            )
+        return executors[name]
+
+
+def shutdown_executors() -> None:
+    """Останавливает пулы; следующий запрос создаст новые."""
+    with executors_lock:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
+        executors.clear()
+
+
+def run_read(view: Callable, request, *args, **kwargs):
+    """
+    Выполняет представление в потоке пула. У каждого потока свои
+    соединения с БД: устаревшие закрываются до и после запроса
+    (с учётом CONN_MAX_AGE). Запросы считает QueryRecorder из
+    контекста запроса, sync_to_async передаёт его в поток пула.
+    """
+    close_old_connections()
+    install_query_recorder()
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view: Callable) -> Callable:
+    """
+    Асинхронная обёртка представления DRF. Права, пагинация и
+    фильтры не меняются: внутри работает то же представление.
+    """
+
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await sync_to_async(view)(request, *args, **kwargs)
+        return await sync_to_async(
+            run_read, thread_sensitive=False, executor=get_executor('read')
+        )(view, request, *args, **kwargs)
+
+    # cls, actions и csrf_exempt нужны QueryCountMiddleware и CSRF.
+    return update_wrapper(wrapper, view)
+
+
+def async_urlpatterns(patterns: List) -> List:
+    """
+    Копия urlpatterns, где представления с async_reads = True
+    обёрнуты async_read_view.
+    """
+    result: List = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            result.append(URLResolver(
+                pattern.pattern, async_urlpatterns(pattern.url_patterns),
+                pattern.default_kwargs, pattern.app_name, pattern.namespace
+            ))
+        elif getattr(getattr(pattern.callback, 'cls', None),
+                     'async_reads', False):
+            result.append(URLPattern(
+                pattern.pattern, async_read_view(pattern.callback),
+                pattern.default_args, pattern.name
+            ))
+        else:
+            result.append(pattern)
+    return result
+
+
+class AsyncReadASGIHandler(ASGIHandler):
+    """
+    ASGIHandler, который разрешает маршруты по ASGI_URLCONF, а части
+    потоковых ответов получает в пуле stream: Django 3.2 перебирает
+    их прямо в цикле событий, и ожидание события в SSE остановило бы
+    все запросы воркера.
+    """
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = settings.ASGI_URLCONF
+        return request, error_response
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ] + [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        parts = iter(response)
+        next_part = sync_to_async(
+            next, thread_sensitive=False, executor=get_executor('stream')
+        )
+        try:
+            while True:
+                part = await next_part(parts, None)
+                if part is None:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
@@ -0,0 +1,30 @@
+import time
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .routers import read_from_replica
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, которая записывает время аутентификации
+    без учёта SQL-запросов в request.server_timing['auth'].
+    Пользователь читается с основной БД: смена роли или блокировка
+    действуют сразу, без задержки репликации.
+    """
+
+    def authenticate(self, request):
+        django_request = getattr(request, '_request', request)
+        recorder = getattr(django_request, 'query_recorder', None)
+        db_before: float = recorder.duration if recorder else 0.0
+        started: float = time.perf_counter()
+        try:
+            with read_from_replica(False):
+                return super().authenticate(request)
+        finally:
+            timings = getattr(django_request, 'server_timing', None)
+            if timings is not None:
+                db = recorder.duration - db_before if recorder else 0.0
+                timings['auth'] = timings.get('auth', 0.0) + max(
+                    time.perf_counter() - started - db, 0
+                )
@@ -0,0 +1,232 @@
+"""
+Категории и жанры в памяти процесса.
+
+Справочники маленькие и меняются редко, а читаются в каждом списке
+произведений и при каждой записи произведения. Catalog держит снимок
+всех строк модели и перечитывает его, только когда меняется общая
+версия SharedVersion: её меняет любой процесс после коммита изменения
+категории или жанра, поэтому снимки всех воркеров остаются свежими.
+"""
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import (Dict, Iterable, List, NamedTuple, Optional, Sequence,
+                    Tuple)
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+
+from reviews.models import Category, Genre
+from .routers import read_from_replica
+
+
+def versions_dir() -> Path:
+    return Path(getattr(
+        settings, 'VERSIONS_DIR',
+        Path(tempfile.gettempdir(), 'yamdb-versions')
+    ))
+
+
+class SharedVersion:
+    """
+    Версия данных, общая для процессов одной машины: случайная метка
+    в файле VERSIONS_DIR/<name>. Файл заменяется атомарно, поэтому
+    читатель видит либо старую метку, либо новую.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+
+    def path(self) -> Path:
+        return versions_dir() / self.name
+
+    def get(self) -> str:
+        try:
+            return self.path().read_text()
+        except FileNotFoundError:
+            return self.bump()
+
+    def bump(self) -> str:
+        path = self.path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        version = uuid.uuid4().hex
+        temporary = path.with_name(f'.{self.name}.{os.getpid()}')
+        temporary.write_text(version)
+        os.replace(temporary, path)
+        return version
+
+
+class Entry(NamedTuple):
+    id: int
+    name: str
+    slug: str
+
+    def represent(self) -> dict:
+        """Как CategorySerializer и GenreSerializer."""
+        return {'name': self.name, 'slug': self.slug}
+
+
+class Snapshot:
+    """Все строки модели на момент версии version, по имени."""
+
+    def __init__(
+        self,
+        version: str,
+        rows: Iterable[Tuple[int, str, str]]
+    ) -> None:
+        self.version: str = version
+        self.entries: Tuple[Entry, ...] = tuple(Entry(*row) for row in rows)
+        self.by_id: Dict[int, Entry] = {
+            entry.id: entry for entry in self.entries
+        }
+        self.by_slug: Dict[str, Entry] = {
+            entry.slug: entry for entry in self.entries
+        }
+        self.position: Dict[int, int] = {
+            entry.id: number for number, entry in enumerate(self.entries)
+        }
+        self.search_keys: Tuple[Tuple[str, str], ...] = tuple(
+            (entry.name.lower(), entry.slug.lower())
+            for entry in self.entries
+        )
+
+    def has(self, ids: Iterable[int]) -> bool:
+        return all(entry_id in self.by_id for entry_id in ids)
+
+    def represent(self, entry_id: Optional[int]) -> Optional[dict]:
+        entry = self.by_id.get(entry_id)
+        return None if entry is None else entry.represent()
+
+    def represent_many(self, ids: Iterable[int]) -> List[dict]:
+        """
+        Записи по id в порядке имён, как Meta.ordering модели. Id, которых
+        нет в снимке (запись удалена или ещё не видна), пропускаются.
+        """
+        return [
+            self.by_id[entry_id].represent()
+            for entry_id in sorted(
+                (entry_id for entry_id in ids if entry_id in self.by_id),
+                key=self.position.__getitem__
+            )
+        ]
+
+    def search(self, terms: Sequence[str]) -> List[Entry]:
+        """
+        Как SearchFilter с search_fields = ('name', 'slug'): каждое
+        слово должно входить в имя или slug без учёта регистра.
+        """
+        terms = [term.lower() for term in terms]
+        if not terms:
+            return list(self.entries)
+        return [
+            entry for entry, (name, slug) in zip(
+                self.entries, self.search_keys
+            ) if all(term in name or term in slug for term in terms)
+        ]
+
+
+class Catalog:
+    """Снимок модели model, который обновляется по её SharedVersion."""
+
+    def __init__(self, model: type) -> None:
+        self.model = model
+        self.version = SharedVersion(f'catalog-{model._meta.model_name}')
+        self.lock = threading.Lock()
+        self.current: Optional[Snapshot] = None
+
+    def __deepcopy__(self, memo: dict) -> 'Catalog':
+        # Поля DRF копируют свои аргументы для каждого сериализатора,
+        # а снимок должен быть один на процесс.
+        return self
+
+    def snapshot(self, ids: Iterable[int] = ()) -> Snapshot:
+        """
+        Актуальный снимок. Если в нём нет какого-то из ids, он
+        перечитывается: запись могла закоммититься раньше, чем
+        сменилась версия.
+        """
+        ids = [entry_id for entry_id in ids if entry_id is not None]
+        snapshot = self.current
+        version = self.version.get()
+        if (
+            snapshot is None or snapshot.version != version
+            or not snapshot.has(ids)
+        ):
+            snapshot = self.load(version, snapshot)
+        return snapshot
+
+    def load(self, version: str, stale: Optional[Snapshot]) -> Snapshot:
+        with self.lock:
+            if self.current is not stale:
+                # Снимок уже перечитал другой поток.
+                return self.current
+            # Версия читается до строк: изменение во время загрузки
+            # сменит её ещё раз, и снимок перечитается снова. Читаем
+            # с основной БД — реплика может отставать от версии.
+            with read_from_replica(False):
+                self.current = Snapshot(
+                    version,
+                    self.model.objects.order_by('name', 'id').values_list(
+                        'id', 'name', 'slug'
+                    )
+                )
+            return self.current
+
+    def get_by_slug(self, slug: str) -> Optional[models.Model]:
+        """Экземпляр модели по slug без запроса к БД."""
+        instances, _ = self.get_many_by_slug((slug,))
+        return instances[0] if instances else None
+
+    def get_many_by_slug(
+        self,
+        slugs: Iterable[str]
+    ) -> Tuple[List[models.Model], List[str]]:
+        """
+        Экземпляры модели по slug из одного снимка и список slug,
+        которых нет. Повторы отбрасываются, порядок сохраняется.
+        Если какого-то slug нет, снимок один раз перечитывается, как
+        и для неизвестных id: версия могла ещё не смениться.
+        """
+        slugs = list(dict.fromkeys(slugs))
+        snapshot = self.snapshot()
+        if not all(slug in snapshot.by_slug for slug in slugs):
+            snapshot = self.load(snapshot.version, snapshot)
+        instances: List[models.Model] = []
+        missing: List[str] = []
+        for slug in slugs:
+            entry = snapshot.by_slug.get(slug)
+            if entry is None:
+                missing.append(slug)
+            else:
+                instances.append(self.model.from_db(
+                    DEFAULT_DB_ALIAS, Entry._fields, entry
+                ))
+        return instances, missing
+
+
+categories = Catalog(Category)
+genres = Catalog(Genre)
+CATALOGS: Dict[type, Catalog] = {Category: categories, Genre: genres}
+# Произведения, их жанры и отзывы: по ней сбрасывается кэш api.facets.
+title_version = SharedVersion('titles')
+
+
+def invalidate(sender: type, using: str = DEFAULT_DB_ALIAS,
+               **kwargs) -> None:
+    """post_save и post_delete категорий и жанров."""
+    transaction.on_commit(CATALOGS[sender].version.bump, using=using)
+
+
+def invalidate_titles(sender: type, using: str = DEFAULT_DB_ALIAS,
+                      **kwargs) -> None:
+    """post_save и post_delete произведений и отзывов, m2m_changed жанров."""
+    transaction.on_commit(title_version.bump, using=using)
+
+
+def invalidate_all(**kwargs) -> None:
+    """post_migrate (в том числе после flush) и загрузка из csv."""
+    for catalog in CATALOGS.values():
+        catalog.version.bump()
+    title_version.bump()
@@ -0,0 +1,124 @@
+"""
+Кодеки для CompressionMiddleware: gzip всегда, brotli и zstd —
+если установлены пакеты brotli и zstandard.
+"""
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL: int = 6
+BROTLI_QUALITY: int = 4
+ZSTD_LEVEL: int = 3
+
+
+class Compressor:
+    """Потоковый интерфейс: compress() для порций и flush() в конце."""
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        raise NotImplementedError
+
+
+class GzipCompressor(Compressor):
+
+    def __init__(self) -> None:
+        # wbits=31 — формат gzip с заголовком и контрольной суммой.
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+
+class BrotliCompressor(Compressor):
+
+    def __init__(self) -> None:
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.finish()
+
+
+class ZstdCompressor(Compressor):
+
+    def __init__(self) -> None:
+        self.compressor = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL
+        ).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+
+# В порядке предпочтения при одинаковом q в Accept-Encoding.
+COMPRESSORS: Dict[str, Callable[[], Compressor]] = {
+    name: compressor for name, compressor, available in (
+        ('zstd', ZstdCompressor, zstandard is not None),
+        ('br', BrotliCompressor, brotli is not None),
+        ('gzip', GzipCompressor, True),
+    ) if available
+}
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Кодировка с наибольшим q из Accept-Encoding среди доступных.
+    """
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    best: Optional[str] = None
+    best_quality: float = 0.0
+    for name in COMPRESSORS:
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress(encoding: str, data: bytes) -> bytes:
+    compressor = COMPRESSORS[encoding]()
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(
+    encoding: str,
+    chunks: Iterable[bytes]
+) -> Iterator[bytes]:
+    """
+    Сжимает поток по мере чтения; пустые порции не отдаются, чтобы
+    сервер не отправлял лишние пустые фрагменты.
+    """
+    compressor = COMPRESSORS[encoding]()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,57 @@
+import random
+import time
+from contextlib import nullcontext
+from functools import partial, wraps
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+LOCKED_MESSAGE: str = 'database is locked'
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs) -> None:
+    """
+    Обработчик connection_created: выполняет SQLITE_PRAGMAS
+    для каждого нового соединения SQLite. PRAGMA идут напрямую
+    в sqlite3, мимо execute_wrappers: они не относятся к запросу,
+    в котором открылось соединение, и не входят в его query_budget.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def retry_on_lock(
+    func: Optional[Callable] = None,
+    *,
+    atomic: bool = True
+) -> Callable:
+    """
+    Повторяет запись, если SQLite вернул «database is locked».
+    Каждая попытка выполняется в своей транзакции (atomic=False —
+    для функций из одного запроса на запись), паузы между попытками
+    растут экспоненциально со случайной добавкой. Внутри внешней
+    транзакции повтор невозможен: ошибка пробрасывается.
+    """
+    if func is None:
+        return partial(retry_on_lock, atomic=atomic)
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        retries: int = settings.DB_LOCK_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                with transaction.atomic() if atomic else nullcontext():
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if (
+                    LOCKED_MESSAGE not in str(error)
+                    or attempt == retries
+                    or connection.in_atomic_block
+                ):
+                    raise
+            delay = settings.DB_LOCK_BACKOFF * 2 ** attempt
+            time.sleep(delay + random.uniform(0, delay))
+    return wrapper
@@ -0,0 +1,282 @@
+"""
+События отзывов и комментариев для SSE (/titles/{id}/events/).
+
+EventHub рассылает события подписчикам этого процесса и хранит
+последние EVENTS_HISTORY событий для возобновления по Last-Event-ID.
+При EVENTS_BACKEND = 'database' события пишутся в TitleEvent в той же
+транзакции, что и изменение, а DatabaseFanout каждого процесса читает
+новые строки и передаёт их своему EventHub; так события доходят до
+подписчиков всех воркеров, а номера событий общие.
+"""
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+from itertools import count
+from typing import (Any, Callable, Deque, Dict, Iterator, List, NamedTuple,
+                    Optional, Set, Tuple)
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.models import TitleEvent
+from .renderers import FastJSONRenderer
+
+# Событие для клиента, который пропустил больше, чем хранит история:
+# ему нужно заново загрузить список отзывов.
+RESET: str = 'reset'
+FANOUT_BATCH: int = 500
+PRUNE_INTERVAL: float = 60.0
+
+
+class Event(NamedTuple):
+    id: int
+    title_id: int
+    type: str
+    data: str
+
+
+class Subscription:
+    """Очередь событий одного клиента."""
+
+    def __init__(self, hub: 'EventHub', title_id: int) -> None:
+        self.hub = hub
+        self.title_id: int = title_id
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    def get(self, timeout: float) -> Optional[Event]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+
+Loader = Callable[[int, int, int], Tuple[List[Event], bool]]
+
+
+class EventHub:
+
+    def __init__(self, history: int) -> None:
+        self.lock = threading.Lock()
+        self.ids = count(1)
+        self.last_id: int = 0
+        self.history: Deque[Event] = deque(maxlen=history)
+        self.subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+
+    def publish(
+        self,
+        title_id: int,
+        type: str,
+        data: str,
+        event_id: Optional[int] = None
+    ) -> Event:
+        with self.lock:
+            event = Event(
+                next(self.ids) if event_id is None else event_id,
+                title_id, type, data
+            )
+            self.last_id = max(self.last_id, event.id)
+            self.history.append(event)
+            for subscription in self.subscribers.get(title_id, ()):
+                subscription.queue.put(event)
+        return event
+
+    def subscribe(
+        self,
+        title_id: int,
+        last_event_id: Optional[int] = None,
+        load: Optional[Loader] = None
+    ) -> Subscription:
+        """
+        Новый подписчик. С last_event_id он сначала получает пропущенные
+        события (из истории процесса или от load), а если их больше,
+        чем хранится, — событие RESET: список нужно загрузить заново.
+        Подписка и выборка пропущенного идут под одной блокировкой,
+        поэтому события не теряются и не приходят дважды.
+        """
+        subscription = Subscription(self, title_id)
+        with self.lock:
+            self.subscribers[title_id].add(subscription)
+            if last_event_id is None or last_event_id >= self.last_id:
+                return subscription
+            missed, complete = (load or self.load_history)(
+                title_id, last_event_id, self.last_id
+            )
+            if not complete:
+                subscription.queue.put(Event(
+                    missed[0].id - 1 if missed else self.last_id,
+                    title_id, RESET, '{}'
+                ))
+            for event in missed:
+                subscription.queue.put(event)
+        return subscription
+
+    def load_history(
+        self,
+        title_id: int,
+        after: int,
+        upto: int
+    ) -> Tuple[List[Event], bool]:
+        return [
+            event for event in self.history
+            if after < event.id <= upto and event.title_id == title_id
+        ], not self.history or self.history[0].id <= after + 1
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.title_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.title_id]
+
+
+class DatabaseFanout(threading.Thread):
+    """
+    Раз в EVENTS_POLL_INTERVAL секунд читает новые строки TitleEvent
+    и публикует их в EventHub процесса с номерами из БД.
+    """
+
+    def __init__(self, hub: EventHub) -> None:
+        super().__init__(daemon=True, name='api-events')
+        self.hub = hub
+        self.last_id: int = TitleEvent.objects.order_by(
+            '-id'
+        ).values_list('id', flat=True).first() or 0
+        with hub.lock:
+            hub.last_id = max(hub.last_id, self.last_id)
+
+    def run(self) -> None:
+        pruned: float = 0.0
+        while True:
+            time.sleep(settings.EVENTS_POLL_INTERVAL)
+            try:
+                self.poll()
+                if time.monotonic() - pruned >= PRUNE_INTERVAL:
+                    prune()
+                    pruned = time.monotonic()
+            except Exception:
+                # Ошибка БД не должна останавливать рассылку навсегда.
+                continue
+
+    def poll(self) -> int:
+        rows = list(TitleEvent.objects.filter(
+            id__gt=self.last_id
+        ).values_list('id', 'title_id', 'type', 'data')[:FANOUT_BATCH])
+        for event_id, title_id, type, data in rows:
+            self.hub.publish(title_id, type, data, event_id=event_id)
+            self.last_id = event_id
+        return len(rows)
+
+    @staticmethod
+    def load_history(
+        title_id: int,
+        after: int,
+        upto: int
+    ) -> Tuple[List[Event], bool]:
+        """
+        Пропущенные события из БД: их могли опубликовать другие
+        воркеры или этот процесс до перезапуска.
+        """
+        limit: int = settings.EVENTS_HISTORY
+        rows = list(TitleEvent.objects.filter(
+            title_id=title_id, id__gt=after, id__lte=upto
+        ).order_by('-id').values_list(
+            'id', 'title_id', 'type', 'data'
+        )[:limit + 1])
+        # prune() удаляет самые старые строки: если первой после
+        # after уже нет, часть событий потеряна.
+        first_id: Optional[int] = TitleEvent.objects.order_by(
+            'id'
+        ).values_list('id', flat=True).first()
+        return [Event(*row) for row in reversed(rows[:limit])], (
+            len(rows) <= limit
+            and (first_id is None or first_id <= after + 1)
+        )
+
+
+def prune() -> int:
+    """Удаляет события старше EVENTS_RETENTION секунд."""
+    deleted, _ = TitleEvent.objects.filter(
+        created__lt=timezone.now() - timedelta(
+            seconds=settings.EVENTS_RETENTION
+        )
+    ).delete()
+    return deleted
+
+
+hub = EventHub(settings.EVENTS_HISTORY)
+fanout: Optional[DatabaseFanout] = None
+fanout_lock = threading.Lock()
+
+
+def use_database() -> bool:
+    return settings.EVENTS_BACKEND == 'database'
+
+
+def start_fanout() -> DatabaseFanout:
+    global fanout
+    with fanout_lock:
+        if fanout is None:
+            fanout = DatabaseFanout(hub)
+            fanout.start()
+        return fanout
+
+
+def publish(title_id: int, type: str, data: Dict[str, Any]) -> None:
+    """
+    Публикует событие, только если текущая транзакция завершится
+    коммитом: в EventHub — через on_commit, в TitleEvent — записью
+    в той же транзакции.
+    """
+    data = FastJSONRenderer().render(data).decode()
+    if use_database():
+        TitleEvent.objects.create(title_id=title_id, type=type, data=data)
+    else:
+        transaction.on_commit(lambda: hub.publish(title_id, type, data))
+
+
+def subscribe(
+    title_id: int,
+    last_event_id: Optional[int] = None
+) -> Subscription:
+    if not use_database():
+        return hub.subscribe(title_id, last_event_id)
+    start_fanout()
+    return hub.subscribe(
+        title_id, last_event_id, DatabaseFanout.load_history
+    )
+
+
+def format_event(event: Event) -> str:
+    return f'id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n'
+
+
+def stream(subscription: Subscription) -> Iterator[str]:
+    """
+    Поток text/event-stream: события, а в паузах комментарии раз
+    в EVENTS_KEEPALIVE секунд, чтобы прокси не закрывали соединение.
+    Через EVENTS_MAX_AGE секунд поток завершается: сервер не всегда
+    узнаёт об ушедшем клиенте, а EventSource переподключится сам,
+    передав Last-Event-ID.
+    """
+    deadline = time.monotonic() + settings.EVENTS_MAX_AGE
+    try:
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            event = subscription.get(
+                min(settings.EVENTS_KEEPALIVE, remaining)
+            )
+            yield ': keepalive\n\n' if event is None else format_event(
+                event
+            )
+    finally:
+        subscription.close()
@@ -0,0 +1,134 @@
+"""
+Счётчики для фильтров списка произведений (/titles/facets/): сколько
+произведений из выборки FilterTitleSet приходится на каждый жанр,
+категорию, десятилетие и диапазон рейтинга.
+
+Каждый разрез — один сгруппированный запрос, всего четыре. Результат
+кэшируется по параметрам фильтра и версиям api.catalog: кэш
+сбрасывается при изменении произведений, отзывов, категорий и жанров
+в любом процессе.
+"""
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import (Avg, Count, ExpressionWrapper, F,
+                              IntegerField, QuerySet)
+from django.http import QueryDict
+
+from reviews.models import Title
+from .catalog import Snapshot, categories, genres, title_version
+from .filters import FilterTitleSet
+from .routers import read_from_replica
+
+# Диапазоны целой части рейтинга (как поле rating в ответах API).
+RATING_BANDS: Tuple[Tuple[int, int], ...] = (
+    (1, 2), (3, 4), (5, 6), (7, 8), (9, 10),
+)
+CACHE_PREFIX: str = 'title-facets'
+
+
+def cache_key(params: QueryDict) -> str:
+    """Ключ из версий и параметров фильтра; прочие параметры не влияют."""
+    filters = sorted(
+        (name, params.getlist(name))
+        for name in FilterTitleSet.base_filters if name in params
+    )
+    digest = hashlib.md5(repr(filters).encode()).hexdigest()
+    versions = ':'.join((
+        title_version.get(), categories.version.get(),
+        genres.version.get(),
+    ))
+    return f'{CACHE_PREFIX}:{versions}:{digest}'
+
+
+def cached_title_facets(params: QueryDict, titles: QuerySet) -> dict:
+    """
+    Счётчики считаются по основной БД, как снимки api.catalog: версии
+    в ключе меняются после коммита в неё, и отстающая реплика записала
+    бы в кэш под новой версией старые данные.
+    """
+    key = cache_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        with read_from_replica(False):
+            facets = title_facets(titles)
+        cache.set(key, facets, settings.FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def title_facets(titles: QuerySet) -> dict:
+    """titles — отфильтрованная выборка без аннотаций и сортировки."""
+    genre_counts: Dict[int, int] = dict(
+        Title.genre.through.objects.filter(
+            title_id__in=titles.values('id')
+        ).values('genre_id').annotate(
+            count=Count('title_id')
+        ).order_by().values_list('genre_id', 'count')
+    )
+    category_counts: Dict[int, int] = dict(
+        titles.exclude(category_id=None).values('category_id').annotate(
+            count=Count('id')
+        ).order_by().values_list('category_id', 'count')
+    )
+    decades: List[Tuple[int, int]] = list(
+        titles.annotate(decade=ExpressionWrapper(
+            F('year') / 10 * 10, output_field=IntegerField()
+        )).values('decade').annotate(
+            count=Count('id')
+        ).order_by('decade').values_list('decade', 'count')
+    )
+    ratings = rating_counts(titles)
+    return {
+        'count': sum(count for _, count in decades),
+        'genre': represent_counts(
+            genres.snapshot(genre_counts), genre_counts
+        ),
+        'category': represent_counts(
+            categories.snapshot(category_counts), category_counts
+        ),
+        'decade': [
+            {'decade': decade, 'count': count} for decade, count in decades
+        ],
+        'rating': [
+            {
+                'min': low,
+                'max': high,
+                'count': sum(
+                    ratings.get(rating, 0)
+                    for rating in range(low, high + 1)
+                ),
+            } for low, high in RATING_BANDS
+        ],
+        'unrated': ratings.get(None, 0),
+    }
+
+
+def rating_counts(titles: QuerySet) -> Dict[Any, int]:
+    """
+    Число произведений по целой части рейтинга, None — без отзывов.
+    Рейтинг — агрегат по отзывам, поэтому группировка по нему идёт
+    во внешнем запросе над подзапросом, которого нет в ORM Django 3.2.
+    """
+    ratings = titles.annotate(rating=Avg('reviews__score')).values('rating')
+    sql, params = ratings.query.sql_with_params()
+    with connections[ratings.db].cursor() as cursor:
+        cursor.execute(
+            'SELECT CAST(rating AS INTEGER), COUNT(*) '
+            f'FROM ({sql}) GROUP BY 1',
+            params
+        )
+        return dict(cursor.fetchall())
+
+
+def represent_counts(
+    snapshot: Snapshot,
+    counts: Dict[int, int]
+) -> List[dict]:
+    """Записи справочника с ненулевым счётчиком, по имени."""
+    return [
+        dict(entry.represent(), count=counts[entry.id])
+        for entry in snapshot.entries if entry.id in counts
+    ]
@@ -1,17 +1,83 @@
-from django_filters.rest_framework import CharFilter, FilterSet
+from django.db.models import Count, QuerySet
+from django_filters.rest_framework import (BaseInFilter, CharFilter,
+                                           ChoiceFilter, FilterSet)
 
 from reviews.models import Title
+from .catalog import categories, genres
+
+GENRE_MODE_ANY: str = 'any'
+GENRE_MODE_ALL: str = 'all'
+
+
+class CharInFilter(BaseInFilter, CharFilter):
+    """Несколько значений через запятую: ?genre=drama,comedy."""
 
 
 class FilterTitleSet(FilterSet):
-    genre = CharFilter('genre__slug')
-    category = CharFilter('category__slug')
+    """
+    genre и category принимают несколько slug через запятую. Для жанров
+    genre_mode=any (по умолчанию) — хотя бы один из жанров, all — все
+    сразу. Slug переводятся в id по api.catalog, поэтому фильтр идёт
+    по индексам reviews_title_genre и category_id без JOIN справочников.
+    """
+    genre = CharInFilter(method='filter_genre')
+    genre_mode = ChoiceFilter(
+        choices=((GENRE_MODE_ANY, GENRE_MODE_ANY),
+                 (GENRE_MODE_ALL, GENRE_MODE_ALL)),
+        method='filter_genre_mode'
+    )
+    category = CharInFilter(method='filter_category')
 
     class Meta:
         model = Title
         fields = (
             'category',
             'genre',
+            'genre_mode',
             'name',
             'year'
         )
+
+    def filter_genre(
+        self,
+        queryset: QuerySet,
+        name: str,
+        value: list
+    ) -> QuerySet:
+        instances, missing = genres.get_many_by_slug(
+            slug for slug in value if slug
+        )
+        ids = [genre.pk for genre in instances]
+        title_genres = Title.genre.through.objects.filter(genre_id__in=ids)
+        if self.form.cleaned_data.get('genre_mode') == GENRE_MODE_ALL:
+            if missing:
+                return queryset.none()
+            # GROUP BY title_id HAVING COUNT(*) = числу жанров.
+            title_genres = title_genres.values('title_id').annotate(
+                genres_count=Count('genre_id')
+            ).filter(genres_count=len(ids))
+        else:
+            title_genres = title_genres.distinct()
+        return queryset.filter(id__in=title_genres.values('title_id'))
+
+    def filter_genre_mode(
+        self,
+        queryset: QuerySet,
+        name: str,
+        value: str
+    ) -> QuerySet:
+        """Режим читает filter_genre."""
+        return queryset
+
+    def filter_category(
+        self,
+        queryset: QuerySet,
+        name: str,
+        value: list
+    ) -> QuerySet:
+        instances, _ = categories.get_many_by_slug(
+            slug for slug in value if slug
+        )
+        return queryset.filter(
+            category_id__in=[category.pk for category in instances]
+        )
@@ -0,0 +1,318 @@
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+Каждый процесс копит метрики в памяти и не чаще раза в FLUSH_INTERVAL
+секунд сбрасывает их в METRICS_DIR/<pid>.json. Эндпоинт /metrics
+складывает файлы всех процессов, поэтому работает с несколькими
+воркерами gunicorn/uwsgi. Файлы завершившихся процессов забирает
+в свои метрики процесс, который отдаёт /metrics.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.test.utils import override_settings
+
+FLUSH_INTERVAL: float = 1.0
+CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Metric(NamedTuple):
+    kind: str
+    help: str
+    buckets: Tuple[float, ...] = ()
+
+
+METRICS: Dict[str, Metric] = {
+    'yamdb_http_requests_total': Metric(
+        'counter', 'Число HTTP-запросов по маршруту, методу и статусу.'
+    ),
+    'yamdb_http_request_duration_seconds': Metric(
+        'histogram', 'Время обработки HTTP-запроса.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    ),
+    'yamdb_db_queries_per_request': Metric(
+        'histogram', 'Число SQL-запросов за один HTTP-запрос.',
+        (0, 1, 2, 3, 5, 10, 20, 50, 100)
+    ),
+    'yamdb_db_duration_seconds': Metric(
+        'histogram', 'Суммарное время SQL-запросов за один HTTP-запрос.',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+    ),
+    'yamdb_cache_requests_total': Metric(
+        'counter', 'Обращения к кэшу: попадания и промахи.'
+    ),
+    'yamdb_email_queue_depth': Metric(
+        'gauge', 'Письма, которые отправляются прямо сейчас.'
+    ),
+}
+
+
+def metrics_dir() -> Path:
+    return Path(getattr(
+        settings, 'METRICS_DIR',
+        Path(tempfile.gettempdir(), 'yamdb-metrics')
+    ))
+
+
+class Registry:
+    """
+    Метрики одного процесса. После fork счётчики родителя
+    сбрасываются, чтобы не учитываться дважды.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.pid: int = os.getpid()
+        self.values: Dict[Tuple[str, Labels], Any] = {}
+        self.flushed: float = 0.0
+
+    def check_fork(self) -> None:
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1) -> None:
+        with self.lock:
+            self.check_fork()
+            key = (name, labels)
+            self.values[key] = self.values.get(key, 0) + value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = METRICS[name].buckets
+        with self.lock:
+            self.check_fork()
+            key = (name, labels)
+            # Накопленные счётчики корзин, затем сумма и количество.
+            series = self.values.setdefault(key, [0] * (len(buckets) + 2))
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def absorb(self, rows: List[List[Any]]) -> None:
+        """Добавляет счётчики и гистограммы из файла другого процесса."""
+        with self.lock:
+            self.check_fork()
+            for name, labels, value in rows:
+                if METRICS[name].kind != 'gauge':
+                    add_value(
+                        self.values, (name, tuple(map(tuple, labels))), value
+                    )
+
+    def snapshot(self) -> List[List[Any]]:
+        with self.lock:
+            self.check_fork()
+            return [
+                [name, list(map(list, labels)), value]
+                for (name, labels), value in self.values.items()
+            ]
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Атомарно записывает метрики процесса в METRICS_DIR/<pid>.json.
+        """
+        now = time.monotonic()
+        if not force and now - self.flushed < FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        directory = metrics_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = Path(directory, f'{os.getpid()}.json')
+        temporary = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, path)
+
+
+registry = Registry()
+
+
+@contextmanager
+def in_progress(name: str, labels: Labels = ()) -> Iterator[None]:
+    """
+    Gauge, который увеличивается на время выполнения блока.
+    """
+    registry.inc(name, labels)
+    try:
+        yield
+    finally:
+        registry.inc(name, labels, -1)
+
+
+def clear() -> int:
+    """
+    Удаляет файлы метрик всех процессов. Вызывается перед запуском
+    сервера, пока воркеров ещё нет: иначе /metrics сложит в счётчики
+    файлы прошлых запусков.
+    """
+    removed = 0
+    for pattern in ('*.json', '*.dead', '*.tmp'):
+        for path in metrics_dir().glob(pattern):
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+@contextmanager
+def temporary_dir() -> Iterator[Path]:
+    """
+    METRICS_DIR во временном каталоге: метрики тестов и команд
+    замера не попадают в /metrics сервера.
+    """
+    with tempfile.TemporaryDirectory() as directory, override_settings(
+        METRICS_DIR=Path(directory)
+    ):
+        registry.reset()
+        try:
+            yield Path(directory)
+        finally:
+            registry.reset()
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_rows(path: Path) -> List[List[Any]]:
+    """Известные метрики из файла процесса; битый файл пропускается."""
+    try:
+        rows = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return []
+    return [row for row in rows if row[0] in METRICS]
+
+
+def add_value(
+    values: Dict[Tuple[str, Labels], Any],
+    key: Tuple[str, Labels],
+    value: Any
+) -> None:
+    """Прибавляет счётчик или гистограмму (список корзин) к values."""
+    if isinstance(value, list):
+        current = values.setdefault(key, [0] * len(value))
+        for index, item in enumerate(value):
+            current[index] += item
+    else:
+        values[key] = values.get(key, 0) + value
+
+
+def absorb_dead_processes() -> None:
+    """
+    Забирает счётчики и гистограммы завершившихся процессов в метрики
+    текущего и удаляет их файлы: так суммы не уменьшаются, а файлы
+    не копятся. Файл сначала переименовывается — его заберёт только
+    один процесс. Gauge завершившихся процессов отбрасываются.
+    """
+    absorbed = []
+    for path in metrics_dir().glob('*.json'):
+        pid = int(path.stem)
+        if pid == os.getpid() or process_alive(pid):
+            continue
+        claimed = path.with_name(f'{path.name}.{os.getpid()}.dead')
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue
+        registry.absorb(read_rows(claimed))
+        absorbed.append(claimed)
+    if absorbed:
+        registry.flush(force=True)
+        for claimed in absorbed:
+            claimed.unlink()
+
+
+def collect() -> Dict[Tuple[str, Labels], Any]:
+    """Складывает метрики всех процессов."""
+    registry.flush(force=True)
+    absorb_dead_processes()
+    total: Dict[Tuple[str, Labels], Any] = {}
+    for path in metrics_dir().glob('*.json'):
+        for name, labels, value in read_rows(path):
+            add_value(total, (name, tuple(map(tuple, labels))), value)
+    return total
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"'
+        ).replace('\n', '\\n'))
+        for name, value in labels
+    ) + '}'
+
+
+def format_number(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def render() -> str:
+    """
+    Метрики в текстовом формате Prometheus 0.0.4.
+    """
+    by_name: Dict[str, List[Tuple[Labels, Any]]] = defaultdict(list)
+    for (name, labels), value in sorted(collect().items()):
+        by_name[name].append((labels, value))
+    lines: List[str] = []
+    for name, metric in METRICS.items():
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for labels, value in by_name.get(name, ()):
+            if metric.kind != 'histogram':
+                lines.append(
+                    f'{name}{format_labels(labels)} {format_number(value)}'
+                )
+                continue
+            for bound, count in zip(
+                metric.buckets + (float('inf'),), value[:-2] + value[-1:]
+            ):
+                le = '+Inf' if bound == float('inf') else format_number(bound)
+                lines.append(
+                    f'{name}_bucket{format_labels(labels + (("le", le),))} '
+                    f'{format_number(count)}'
+                )
+            lines.append(
+                f'{name}_sum{format_labels(labels)} {format_number(value[-2])}'
+            )
+            lines.append(
+                f'{name}_count{format_labels(labels)} '
+                f'{format_number(value[-1])}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsLocMemCache(LocMemCache):
+    """
+    LocMemCache, который считает попадания и промахи. get_many
+    и get_or_set базового класса работают через get и тоже учитываются.
+    """
+    MISSING = object()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self.MISSING, version)
+        registry.inc('yamdb_cache_requests_total', (
+            ('result', 'miss' if value is self.MISSING else 'hit'),
+        ))
+        return default if value is self.MISSING else value
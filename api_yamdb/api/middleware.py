@@ -0,0 +1,506 @@
+import asyncio
+import contextvars
+import logging
+import random
+import re
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import async_to_sync, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.status import HTTP_409_CONFLICT
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import compression, metrics
+from .profiling import PROFILERS, ProfilerBusy
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger('api.slow')
+
+DUPLICATE_THRESHOLD: int = 3
+SLOW_LOG_MAX_PLANS: int = 20
+TRANSACTION_STATEMENTS: Tuple[str, ...] = (
+    'BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT',
+)
+PROFILE_PARAM: str = '_profile'
+PIN_COOKIE: str = 'yamdb_primary'
+PIN_HEADER: str = 'HTTP_X_READ_PRIMARY'
+SAFE_METHODS: Tuple[str, ...] = ('GET', 'HEAD', 'OPTIONS')
+COMPRESSIBLE_TYPES: Tuple[str, ...] = (
+    'application/json', 'application/msgpack', 'text/csv', 'text/html',
+    'text/plain',
+)
+FINGERPRINT_PATTERNS: Tuple[Tuple[re.Pattern, str], ...] = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+# QueryRecorder текущего запроса. Под ASGI синхронные части разных
+# запросов выполняются в одном потоке и с одними соединениями, поэтому
+# запросы к БД относятся к запросу по контексту, а не по потоку.
+active_recorder: contextvars.ContextVar = contextvars.ContextVar(
+    'active_recorder', default=None
+)
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше SQL-запросов, чем объявлено."""
+
+
+def fingerprint(sql: str) -> str:
+    """
+    SQL без конкретных значений: запросы, отличающиеся только
+    параметрами (типичный N+1), получают одинаковый отпечаток.
+    """
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class QueryRecorder:
+    """
+    Обёртка execute_wrappers: считает запросы, их суммарное время
+    и повторы одинаковых запросов. Управление транзакциями (BEGIN,
+    SAVEPOINT) учитывается во времени, но не в числе запросов.
+    С capture=True сохраняет и сами запросы с параметрами.
+    """
+
+    def __init__(self, capture: bool = False) -> None:
+        self.count: int = 0
+        self.duration: float = 0.0
+        self.fingerprints: Counter = Counter()
+        self.capture: bool = capture
+        self.queries: List[Tuple[Any, str, Any, bool, float]] = []
+
+    def __call__(
+        self,
+        execute: Callable,
+        sql: str,
+        params: Any,
+        many: bool,
+        context: Dict[str, Any]
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.duration += elapsed
+            if sql.startswith(TRANSACTION_STATEMENTS):
+                return
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+            if self.capture:
+                self.queries.append(
+                    (context['connection'], sql, params, many, elapsed)
+                )
+
+    def duplicates(
+        self,
+        threshold: int = DUPLICATE_THRESHOLD
+    ) -> List[Tuple[str, int]]:
+        return [
+            (sql, count) for sql, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+
+def record_query(
+    execute: Callable,
+    sql: str,
+    params: Any,
+    many: bool,
+    context: Dict[str, Any]
+) -> Any:
+    """Передаёт запрос QueryRecorder из active_recorder, если он есть."""
+    recorder: Optional[QueryRecorder] = active_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder() -> None:
+    """
+    Подключает record_query к соединениям текущего потока. Обёртка
+    остаётся на соединении: без active_recorder она ничего не считает.
+    """
+    for connection in connections.all():
+        if record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(record_query)
+
+
+def get_query_budget(view_func: Callable, method: str) -> Tuple[
+    Optional[int], str
+]:
+    """
+    Бюджет запросов из атрибута query_budget класса представления:
+    число или словарь по действию ViewSet (list, retrieve, ...)
+    либо по HTTP-методу для APIView.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return None, getattr(view_func, '__name__', '')
+    method = method.lower()
+    action = (getattr(view_func, 'actions', None) or {}).get(method, method)
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        budget = budget.get(action)
+    return budget, f'{view_class.__name__}.{action}'
+
+
+class QueryCountMiddleware(MiddlewareMixin):
+    """
+    Считает SQL-запросы каждого запроса и сверяет их с бюджетом
+    представления. Превышение бюджета и повторяющиеся запросы
+    записываются в лог, а при QUERY_BUDGET_RAISE — приводят
+    к исключению QueryBudgetExceeded.
+    """
+
+    def process_request(self, request) -> None:
+        request.query_recorder = QueryRecorder(
+            capture=getattr(request, 'capture_sql', False)
+        )
+        active_recorder.set(request.query_recorder)
+        install_query_recorder()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget, request.query_view = get_query_budget(
+            view_func, request.method
+        )
+
+    def process_response(self, request, response):
+        recorder: Optional[QueryRecorder] = getattr(
+            request, 'query_recorder', None
+        )
+        if recorder is None:
+            return response
+        active_recorder.set(None)
+        if settings.DEBUG:
+            response['X-Query-Count'] = recorder.count
+        self.check_budget(request, recorder)
+        return response
+
+    def check_budget(self, request, recorder: QueryRecorder) -> None:
+        view: str = getattr(request, 'query_view', request.path)
+        budget: Optional[int] = getattr(request, 'query_budget', None)
+        problems: List[str] = []
+        if budget is not None and recorder.count > budget:
+            problems.append(
+                f'{view}: {recorder.count} SQL-запросов при бюджете {budget}'
+            )
+        for sql, count in recorder.duplicates():
+            problems.append(f'{view}: запрос повторяется {count} раз: {sql}')
+        for problem in problems:
+            logger.warning(problem)
+        if problems and getattr(settings, 'QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded('\n'.join(problems))
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """
+    Записывает в api.metrics время запроса, статус и число SQL-запросов.
+    Маршрут берётся из имени url, чтобы число серий не зависело от id
+    в пути. Должен стоять перед QueryCountMiddleware.
+    """
+
+    def process_request(self, request) -> None:
+        request.metrics_started = time.perf_counter()
+
+    def process_response(self, request, response):
+        started: Optional[float] = getattr(request, 'metrics_started', None)
+        if started is None:
+            return response
+        match = getattr(request, 'resolver_match', None)
+        view: str = match.url_name if match and match.url_name else (
+            'unresolved'
+        )
+        labels: metrics.Labels = (('view', view), ('method', request.method))
+        metrics.registry.inc(
+            'yamdb_http_requests_total',
+            labels + (('status', str(response.status_code)),)
+        )
+        metrics.registry.observe(
+            'yamdb_http_request_duration_seconds', labels,
+            time.perf_counter() - started
+        )
+        recorder: Optional[QueryRecorder] = getattr(
+            request, 'query_recorder', None
+        )
+        if recorder is not None:
+            metrics.registry.observe(
+                'yamdb_db_queries_per_request', labels, recorder.count
+            )
+            metrics.registry.observe(
+                'yamdb_db_duration_seconds', labels, recorder.duration
+            )
+        metrics.registry.flush()
+        return response
+
+
+class ServerTimingMiddleware(MiddlewareMixin):
+    """
+    Заголовок Server-Timing с разбивкой времени запроса: auth
+    (без SQL), db (все SQL-запросы), serialize (остальное время
+    представления) и render. Запросы дольше SLOW_REQUEST_THRESHOLD
+    из выборки SLOW_REQUEST_SAMPLE_RATE пишутся в лог api.slow вместе
+    с SQL без параметров и планами запросов. SQL сохраняется только
+    для запросов, попавших в выборку. Должен стоять перед
+    QueryCountMiddleware.
+    """
+
+    def process_request(self, request) -> None:
+        request.server_timing = {}
+        request.server_timing_started = time.perf_counter()
+        request.capture_sql = random.random() < getattr(
+            settings, 'SLOW_REQUEST_SAMPLE_RATE', 0
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = getattr(request, 'query_recorder', None)
+        request.server_timing_view = (
+            time.perf_counter(), recorder.duration if recorder else 0.0
+        )
+
+    def process_template_response(self, request, response):
+        self.finish_view(request)
+        started = time.perf_counter()
+
+        def rendered(response):
+            request.server_timing['render'] = time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def finish_view(self, request) -> None:
+        view: Optional[Tuple[float, float]] = getattr(
+            request, 'server_timing_view', None
+        )
+        timings: Dict[str, float] = request.server_timing
+        if view is None or 'serialize' in timings:
+            return
+        recorder = getattr(request, 'query_recorder', None)
+        started, db_before = view
+        db = recorder.duration - db_before if recorder else 0.0
+        timings['serialize'] = max(
+            time.perf_counter() - started - db - timings.get('auth', 0.0), 0
+        )
+
+    def process_response(self, request, response):
+        timings: Optional[Dict[str, float]] = getattr(
+            request, 'server_timing', None
+        )
+        if timings is None:
+            return response
+        self.finish_view(request)
+        total = time.perf_counter() - request.server_timing_started
+        recorder: Optional[QueryRecorder] = getattr(
+            request, 'query_recorder', None
+        )
+        entries: List[str] = []
+        for name in ('auth', 'db', 'serialize', 'render'):
+            if name == 'db' and recorder is not None:
+                entries.append(
+                    f'db;dur={recorder.duration * 1000:.2f};'
+                    f'desc="{recorder.count} queries"'
+                )
+            elif name in timings:
+                entries.append(f'{name};dur={timings[name] * 1000:.2f}')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        response['Server-Timing'] = ', '.join(entries)
+        if (
+            recorder is not None and recorder.capture
+            and total >= getattr(settings, 'SLOW_REQUEST_THRESHOLD', 1.0)
+        ):
+            self.log_slow_request(request, response, total, recorder)
+        return response
+
+    def log_slow_request(
+        self,
+        request,
+        response,
+        total: float,
+        recorder: QueryRecorder
+    ) -> None:
+        lines: List[str] = [
+            f'{request.method} {request.get_full_path()} '
+            f'{response.status_code}: {total * 1000:.1f} мс, '
+            f'{response["Server-Timing"]}'
+        ]
+        explained: set = set()
+        for connection, sql, params, many, elapsed in recorder.queries:
+            # Параметры (email, код подтверждения) в лог не пишутся:
+            # они нужны только для EXPLAIN.
+            lines.append(f'  {elapsed * 1000:.2f} мс: {sql}')
+            key = fingerprint(sql)
+            if (
+                many or key in explained
+                or len(explained) >= SLOW_LOG_MAX_PLANS
+                or not sql.lstrip().upper().startswith('SELECT')
+            ):
+                continue
+            explained.add(key)
+            for row in explain(connection, sql, params):
+                lines.append(f'    {row}')
+        slow_logger.warning('\n'.join(lines))
+
+
+def explain(connection, sql: str, params: Any) -> List[str]:
+    """
+    План запроса: EXPLAIN QUERY PLAN в SQLite, EXPLAIN в остальных БД.
+    Запрос мог выполниться в другом потоке (api.asgi), поэтому берётся
+    соединение текущего потока с тем же alias.
+    """
+    connection = connections[connection.alias]
+    prefix = (
+        'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return [
+                ' '.join(map(str, row)) for row in cursor.fetchall()
+            ]
+    except DatabaseError as error:
+        return [f'EXPLAIN не выполнен: {error}']
+
+
+class ProfilingMiddleware:
+    """
+    Администратор может добавить к любому запросу ?_profile=cprofile,
+    collapsed или tracemalloc и получить отчёт профилировщика вместо
+    ответа. Без параметра проверяется только наличие подстроки в
+    QUERY_STRING; JWT читается лишь при наличии параметра.
+    Работает и под ASGI, но там чтение выполняется в пуле потоков
+    (api.asgi), и cprofile с collapsed видят только ожидание ответа.
+    """
+    sync_capable: bool = True
+    async_capable: bool = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.acall(request)
+        if PROFILE_PARAM not in request.META.get('QUERY_STRING', ''):
+            return self.get_response(request)
+        return self.profile(request, lambda: self.get_response(request))
+
+    async def acall(self, request):
+        if PROFILE_PARAM not in request.META.get('QUERY_STRING', ''):
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(
+            request, lambda: async_to_sync(self.get_response)(request)
+        )
+
+    def profile(self, request, run: Callable[[], Any]):
+        profiler = PROFILERS.get(request.GET.get(PROFILE_PARAM))
+        if profiler is None or not self.is_admin(request):
+            return run()
+        try:
+            response, report = profiler(run)
+        except ProfilerBusy as error:
+            return HttpResponse(
+                f'{error}\n', status=HTTP_409_CONFLICT,
+                content_type='text/plain; charset=utf-8'
+            )
+        profile = HttpResponse(
+            report, content_type='text/plain; charset=utf-8'
+        )
+        profile['X-Profiled-Status'] = response.status_code
+        return profile
+
+    def is_admin(self, request) -> bool:
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        if authenticated is None:
+            return False
+        user = authenticated[0]
+        return user.is_admin or user.is_superuser
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    """
+    После успешного запроса на запись ставит cookie, и ближайшие
+    REPLICA_PIN_SECONDS секунд чтение этого клиента идёт с основной БД.
+    Клиенты без cookie могут передать заголовок X-Read-Primary.
+    """
+
+    def process_request(self, request) -> None:
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        request.pin_primary = (
+            pinned_until > time.time() or PIN_HEADER in request.META
+        )
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds: int = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, f'{time.time() + seconds:.0f}',
+                max_age=seconds, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает ответы по Accept-Encoding: zstd и br, если установлены,
+    иначе gzip. Обычные ответы сжимаются от COMPRESSION_MIN_SIZE байт,
+    потоковые — всегда, по мере отдачи. Сильный ETag (его ставит
+    ConditionalGetMiddleware по несжатому телу) становится слабым:
+    он одинаков для всех кодировок и остаётся верным для If-None-Match.
+    """
+
+    def process_response(self, request, response):
+        if (
+            response.status_code != 200
+            or response.has_header('Content-Encoding')
+            or 'no-transform' in response.get('Cache-Control', '')
+            or not response.get('Content-Type', '').startswith(
+                COMPRESSIBLE_TYPES
+            )
+        ):
+            return response
+        if not response.streaming and len(response.content) < getattr(
+            settings, 'COMPRESSION_MIN_SIZE', 1024
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compression.compress_stream(
+                encoding, response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            compressed = compression.compress(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = encoding
+        return response
@@ -1,13 +1,131 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
 from rest_framework.mixins import (CreateModelMixin, DestroyModelMixin,
                                    ListModelMixin)
 from rest_framework.viewsets import GenericViewSet
 
+from . import events
+from .db import retry_on_lock
 from .permissions import IsAdminOrReadOnlyPermission
+from .routers import read_from_replica
+
+
+class RetryOnLockMixin:
+    """
+    Создание, изменение и удаление повторяются, если SQLite
+    вернул «database is locked».
+    """
+
+    @retry_on_lock
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @retry_on_lock
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @retry_on_lock
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
+
+class PublishEventsMixin:
+    """
+    Создание, изменение и удаление публикуют событие
+    '<event_name>.created|updated|deleted' в api.events для произведения
+    из title_id. В data — ответ представления (для удаления — id)
+    и числовые параметры url из event_kwargs.
+    """
+    event_name: str = ''
+    event_kwargs: tuple = ()
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        self.publish_event('created', response.data)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        self.publish_event('updated', response.data)
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        response = super().destroy(request, *args, **kwargs)
+        self.publish_event('deleted', {'id': int(self.kwargs['pk'])})
+        return response
+
+    def publish_event(self, action: str, data: dict) -> None:
+        events.publish(
+            int(self.kwargs['title_id']), f'{self.event_name}.{action}',
+            dict(data, **{
+                name: int(self.kwargs[name]) for name in self.event_kwargs
+            })
+        )
+
+
+class ReadReplicaMixin:
+    """
+    Чтение (GET, HEAD, OPTIONS) идёт с реплик, если клиент
+    не закреплён за основной БД после своей записи.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_from_replica(
+            request.method in SAFE_METHODS
+            and not getattr(request, 'pin_primary', False)
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ValuesListMixin:
+    """
+    list() через values_reader (api.readers): ответ собирается из строк
+    .values() без создания моделей и сериализаторов. Без values_reader
+    работает обычный list().
+    """
+    values_reader = None
+
+    def list(self, request, *args, **kwargs):
+        if self.values_reader is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.values_reader.values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                self.values_reader.represent(page)
+            )
+        return Response(self.values_reader.represent(queryset))
+
+
+class CatalogListMixin:
+    """
+    list() и поиск ?search= из снимка api.catalog: без запросов к БД,
+    пока справочник не изменился. Без catalog работает обычный list().
+    """
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        if self.catalog is None:
+            return super().list(request, *args, **kwargs)
+        entries = self.catalog.snapshot().search(
+            SearchFilter().get_search_terms(request)
+        )
+        page = self.paginate_queryset(entries)
+        if page is not None:
+            return self.get_paginated_response(
+                [entry.represent() for entry in page]
+            )
+        return Response([entry.represent() for entry in entries])
 
 
 class CategoryGenreMixin(
+    ReadReplicaMixin,
+    RetryOnLockMixin,
+    CatalogListMixin,
     GenericViewSet,
     CreateModelMixin,
     DestroyModelMixin,
@@ -17,3 +135,4 @@ class CategoryGenreMixin(
     filter_backends: tuple = (DjangoFilterBackend, SearchFilter)
     search_fields: tuple = ('name', 'slug',)
     lookup_field: str = 'slug'
+    async_reads: bool = True
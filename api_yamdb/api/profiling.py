@@ -0,0 +1,127 @@
+"""
+Профилирование одного запроса по ?_profile=<режим>.
+
+Каждый профилировщик получает функцию, выполняющую запрос,
+и возвращает текстовый отчёт вместо обычного ответа.
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+PROFILE_LIMIT: int = 60
+SAMPLE_INTERVAL: float = 0.001
+TRACEMALLOC_FRAMES: int = 10
+# tracemalloc включается на весь процесс: два одновременных замера
+# останавливали бы друг другу трассировку и сбрасывали пик.
+tracemalloc_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Профилировщик уже занят другим запросом этого процесса."""
+
+
+def profile_cprofile(run: Callable[[], Any]) -> Tuple[Any, str]:
+    """
+    cProfile: функции, отсортированные по накопленному времени.
+    """
+    profiler = cProfile.Profile()
+    response = profiler.runcall(run)
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats(
+        pstats.SortKey.CUMULATIVE
+    ).print_stats(PROFILE_LIMIT)
+    return response, output.getvalue()
+
+
+class StackSampler(threading.Thread):
+    """
+    Раз в SAMPLE_INTERVAL секунд снимает стек потока thread_id.
+    """
+
+    def __init__(self, thread_id: int) -> None:
+        super().__init__(daemon=True)
+        self.thread_id: int = thread_id
+        self.stacks: Counter = Counter()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{"/".join(Path(code.co_filename).parts[-2:])}'
+                    f':{code.co_name}'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+def profile_collapsed(run: Callable[[], Any]) -> Tuple[Any, str]:
+    """
+    Сэмплирующий профилировщик: стеки в формате collapsed
+    («a;b;c число»), который принимают flamegraph.pl и speedscope.
+    """
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    try:
+        response = run()
+    finally:
+        sampler.stopped.set()
+        sampler.join()
+    return response, ''.join(
+        f'{stack} {count}\n' for stack, count in sorted(
+            sampler.stacks.items()
+        )
+    )
+
+
+def profile_tracemalloc(run: Callable[[], Any]) -> Tuple[Any, str]:
+    """
+    tracemalloc: пик памяти и строки кода, выделившие больше всего.
+    Одновременно в процессе выполняется только один такой замер,
+    остальные получают ProfilerBusy. Выделения других запросов,
+    идущих в это время, тоже попадают в отчёт.
+    """
+    if not tracemalloc_lock.acquire(blocking=False):
+        raise ProfilerBusy('Профилирование памяти уже выполняется.')
+    try:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        try:
+            before = tracemalloc.take_snapshot()
+            response = run()
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+        finally:
+            if started:
+                tracemalloc.stop()
+    finally:
+        tracemalloc_lock.release()
+    filters = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    )
+    lines = [f'Пик памяти: {peak / 1024:.1f} КБ', '']
+    for statistic in after.filter_traces(filters).compare_to(
+        before.filter_traces(filters), 'lineno'
+    )[:PROFILE_LIMIT]:
+        lines.append(str(statistic))
+    return response, '\n'.join(lines) + '\n'
+
+
+PROFILERS: Dict[str, Callable[[Callable[[], Any]], Tuple[Any, str]]] = {
+    'cprofile': profile_cprofile,
+    'collapsed': profile_collapsed,
+    'tracemalloc': profile_tracemalloc,
+}
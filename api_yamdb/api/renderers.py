@@ -0,0 +1,128 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+LINE_SEPARATOR: bytes = '\u2028'.encode()
+PARAGRAPH_SEPARATOR: bytes = '\u2029'.encode()
+ORJSON_OPTIONS: int = 0
+if orjson is not None:
+    # Даты отдаются в DRF JSONEncoder, чтобы формат совпадал с json.
+    ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+def use_orjson() -> bool:
+    return orjson is not None and getattr(
+        settings, 'JSON_BACKEND', 'orjson'
+    ) == 'orjson'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson: тот же байтовый результат, что у DRF
+    (компактный JSON в UTF-8, экранированные U+2028 и U+2029), типы,
+    которых orjson не знает (Decimal, datetime, ленивые строки),
+    кодирует DRF JSONEncoder. Без orjson, при JSON_BACKEND = 'json',
+    с indent и на значениях, которые orjson не поддерживает
+    (целые больше 64 бит), работает стандартный json.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not use_orjson() or not self.compact or (
+            self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        return ret.replace(LINE_SEPARATOR, b'\\u2028').replace(
+            PARAGRAPH_SEPARATOR, b'\\u2029'
+        )
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser на orjson для тел в UTF-8; остальное разбирает json.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET
+        )
+        if not use_orjson() or encoding.lower() not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack для машинных клиентов (Accept: application/msgpack).
+    Типы, которых msgpack не знает, кодирует DRF JSONEncoder, поэтому
+    после распаковки данные совпадают с разобранным JSON.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.encoder_class().default)
+
+
+class MessagePackParser(BaseParser):
+    """
+    Разбирает тела с Content-Type: application/msgpack.
+    """
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    text/event-stream. Сам поток событий отдаётся StreamingHttpResponse,
+    а через рендерер проходят только ошибки (404, 406): одно событие
+    error с JSON в data.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b'event: error\ndata: ' + FastJSONRenderer().render(
+            data
+        ) + b'\n\n'
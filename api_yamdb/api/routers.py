@@ -0,0 +1,56 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+replica_reads: ContextVar[bool] = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def read_from_replica(enabled: bool = True) -> Iterator[None]:
+    """
+    Чтение внутри блока идёт с реплик (enabled=True) или с основной БД.
+    """
+    token = replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+def choose_replica() -> Optional[str]:
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    """
+    Чтение в блоке read_from_replica() уходит на случайную реплику из
+    DATABASE_REPLICAS, всё остальное — на основную БД. Запись всегда
+    идёт в основную БД, даже для объектов, прочитанных с реплики.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        if replica_reads.get():
+            return choose_replica()
+        return None
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(
+        self,
+        db: str,
+        app_label: str,
+        model_name: Optional[str] = None,
+        **hints
+    ) -> Optional[bool]:
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -1,11 +1,17 @@
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
+from django.utils.encoding import smart_str
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.serializers import CharField, Serializer
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.serializers import (BooleanField, CharField, ListField,
+                                        Serializer)
 from datetime import datetime
 
 from reviews.models import Category, Comment, Genre, Title, Review, User
+from reviews.validators import validate_username
+from .catalog import Catalog, categories, genres
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -22,15 +28,97 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
+class CatalogSlugField(serializers.SlugRelatedField):
+    """SlugRelatedField, который ищет slug в api.catalog, а не в БД."""
+
+    def __init__(self, catalog: Catalog, **kwargs) -> None:
+        self.catalog = catalog
+        kwargs['slug_field'] = 'slug'
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return CatalogSlugListField(**list_kwargs)
+
+    def use_pk_only_optimization(self):
+        return True
+
+    def to_representation(self, value):
+        # Снимок перечитывается с основной БД, если в нём нет value.pk;
+        # если записи нет и там, она удалена после чтения произведения.
+        entry = self.catalog.snapshot((value.pk,)).by_id.get(value.pk)
+        return None if entry is None else entry.slug
+
+    def to_internal_value(self, data):
+        instance = self.catalog.get_by_slug(smart_str(data))
+        if instance is None:
+            self.fail(
+                'does_not_exist', slug_name=self.slug_field,
+                value=smart_str(data)
+            )
+        return instance
+
+
+class CatalogSlugListField(serializers.ManyRelatedField):
+    """
+    Список slug проверяется целиком по одному снимку api.catalog:
+    в ошибке перечислены все неизвестные slug, а не только первый.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        instances, missing = child.catalog.get_many_by_slug(
+            smart_str(item) for item in data
+        )
+        if missing:
+            raise ValidationError([
+                child.error_messages['does_not_exist'].format(
+                    slug_name=child.slug_field, value=slug
+                ) for slug in missing
+            ])
+        return instances
+
+
+class CatalogField(serializers.Field):
+    """Категория по category_id из api.catalog."""
+
+    def __init__(self, catalog: Catalog, **kwargs) -> None:
+        self.catalog = catalog
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return self.catalog.snapshot((value,)).represent(value)
+
+
+class CatalogManyField(CatalogField):
+    """
+    Жанры из api.catalog по id из prefetch_related: из БД читаются
+    только id.
+    """
+
+    def to_representation(self, value):
+        ids = [item.pk for item in value.all()]
+        return self.catalog.snapshot(ids).represent_many(ids)
+
+
 class TitleWriteSerializer(serializers.ModelSerializer):
-    category = serializers.SlugRelatedField(
+    category = CatalogSlugField(
+        categories,
         queryset=Category.objects.all(),
-        slug_field='slug',
         many=False,
     )
-    genre = serializers.SlugRelatedField(
+    genre = CatalogSlugField(
+        genres,
         queryset=Genre.objects.all(),
-        slug_field='slug',
         many=True,
     )
 
@@ -45,6 +133,40 @@ class TitleWriteSerializer(serializers.ModelSerializer):
             'category',
         )
 
+    def create(self, validated_data):
+        genres = validated_data.pop('genre', [])
+        title = super().create(validated_data)
+        self.set_genres(title, genres, created=True)
+        return title
+
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genre', None)
+        title = super().update(instance, validated_data)
+        if genres is not None:
+            self.set_genres(title, genres)
+        return title
+
+    def set_genres(self, title, genres, created=False):
+        """
+        Жанры произведения: новые связи вставляются одним bulk_create,
+        лишние удаляются одним DELETE. genre.set() делает на запрос
+        больше и проверяет существующие связи даже у нового объекта.
+        """
+        through = Title.genre.through
+        ids = [genre.pk for genre in genres]
+        current = set() if created else set(through.objects.filter(
+            title_id=title.pk
+        ).values_list('genre_id', flat=True))
+        removed = current.difference(ids)
+        if removed:
+            through.objects.filter(
+                title_id=title.pk, genre_id__in=removed
+            ).delete()
+        through.objects.bulk_create([
+            through(title_id=title.pk, genre_id=genre_id)
+            for genre_id in ids if genre_id not in current
+        ])
+
     def validate_year(self, value):
         current_year = datetime.now().year
         if value > current_year:
@@ -55,12 +177,12 @@ class TitleWriteSerializer(serializers.ModelSerializer):
 
 
 class TitleReadSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(
-        read_only=True
+    category = CatalogField(
+        categories,
+        source='category_id'
     )
-    genre = GenreSerializer(
-        many=True,
-        read_only=True,
+    genre = CatalogManyField(
+        genres
     )
     rating = serializers.IntegerField(
         read_only=True
@@ -124,10 +246,39 @@ class CommentSerializer(serializers.ModelSerializer):
 
 
 class CreateUserSerializer(serializers.ModelSerializer):
+    """
+    Регистрация: новый пользователь создаётся, а при повторном запросе с
+    той же парой username и email обновляется существующий. Уникальность
+    проверяется одним запросом вместо отдельных UniqueValidator.
+    """
 
     class Meta:
         model = User
         fields = ('username', 'email')
+        extra_kwargs = {
+            'username': {'validators': (validate_username,)},
+            'email': {'validators': ()},
+        }
+
+    def validate(self, data):
+        errors = {}
+        for user in User.objects.filter(
+            Q(username=data['username']) | Q(email=data['email'])
+        )[:2]:
+            if (user.username, user.email) == (
+                data['username'], data['email']
+            ):
+                self.instance = user
+                return data
+            if user.username == data['username']:
+                errors['username'] = [
+                    'Пользователь с таким именем уже существует.'
+                ]
+            if user.email == data['email']:
+                errors['email'] = ['Эта почта уже зарегистрирована']
+        if errors:
+            raise ValidationError(errors)
+        return data
 
 
 class TokenSerializer(Serializer):
@@ -150,6 +301,48 @@ class UsersSerializer(serializers.ModelSerializer):
         return value
 
 
+class UsersBulkUpdateSerializer(Serializer):
+    """
+    Массовое изменение пользователей: список username и общие для всех
+    значения полей. Поля проверяются так же, как в UsersSerializer.
+    """
+    BULK_FIELDS: tuple = ('first_name', 'last_name', 'bio', 'role')
+    UNIQUE_FIELDS: tuple = ('username', 'email')
+    MAX_USERNAMES: int = 1000
+
+    usernames = ListField(
+        child=CharField(max_length=150),
+        allow_empty=False,
+        max_length=MAX_USERNAMES
+    )
+    is_active = BooleanField(required=False)
+
+    def validate(self, data):
+        errors = {
+            field: ['Это поле нельзя изменить массово.']
+            for field in self.UNIQUE_FIELDS if field in self.initial_data
+        }
+        if errors:
+            raise ValidationError(errors)
+        user_serializer = UsersSerializer(
+            data={
+                field: self.initial_data[field]
+                for field in self.BULK_FIELDS if field in self.initial_data
+            },
+            partial=True
+        )
+        user_serializer.is_valid(raise_exception=True)
+        changes = dict(user_serializer.validated_data)
+        if 'is_active' in data:
+            changes['is_active'] = data['is_active']
+        if not changes:
+            raise ValidationError('Не переданы поля для изменения.')
+        return {
+            'usernames': list(dict.fromkeys(data['usernames'])),
+            'changes': changes,
+        }
+
+
 class SelfSerializer(serializers.ModelSerializer):
 
     class Meta:
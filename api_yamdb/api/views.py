@@ -2,12 +2,17 @@ import string
 import random
 from functools import lru_cache
 
+from django.conf import settings
 from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError
+from django.db.models import Avg, Prefetch
+from django.http import (Http404, HttpResponse, HttpResponseForbidden,
+                         StreamingHttpResponse)
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
@@ -15,8 +20,19 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 from rest_framework.views import APIView
 
+from . import events, facets, metrics
+from .catalog import categories, genres
 from .filters import FilterTitleSet
-from .mixins import CategoryGenreMixin
+from .db import retry_on_lock
+from .mixins import (
+    CategoryGenreMixin,
+    PublishEventsMixin,
+    ReadReplicaMixin,
+    RetryOnLockMixin,
+    ValuesListMixin
+)
+from .readers import CommentReader, ReviewReader, TitleReader
+from .renderers import EventStreamRenderer
 from .permissions import (
     IsAdminOnlyPermission,
     IsAdminOrReadOnlyPermission,
@@ -29,6 +45,7 @@ from .serializers import (
     CommentSerializer,
     GenreSerializer,
     TokenSerializer,
+    UsersBulkUpdateSerializer,
     UsersSerializer,
     ReviewSerializer,
     TitleReadSerializer,
@@ -40,32 +57,112 @@ from reviews.models import Category, Genre, Review, Title, User
 
 
 class CategoryViewSet(CategoryGenreMixin):
+    query_budget = {'list': 3, 'create': 3, 'destroy': 5}
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    catalog = categories
 
 
 class GenreViewSet(CategoryGenreMixin):
+    query_budget = {'list': 3, 'create': 3, 'destroy': 5}
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    catalog = genres
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all().annotate(rating=Avg('reviews__score'))
+class TitleViewSet(
+    ReadReplicaMixin,
+    RetryOnLockMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet
+):
+    # Порядок задан явно: без JOIN категорий SQLite группирует строки
+    # по индексу category_id, и страницы шли бы не по id.
+    queryset = Title.objects.all().annotate(
+        rating=Avg('reviews__score')
+    ).order_by('id').prefetch_related(
+        # Только id: названия и порядок жанров даёт api.catalog.
+        Prefetch('genre', queryset=Genre.objects.only('id').order_by())
+    )
     permission_classes = (IsAdminOrReadOnlyPermission,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = FilterTitleSet
     http_method_names = ['get', 'patch', 'post', 'delete']
+    values_reader = TitleReader()
+    async_reads = True
+    # Везде, кроме удаления, +2 запроса: перечитывание категорий
+    # и жанров в api.catalog.
+    query_budget = {
+        'list': 6, 'retrieve': 5, 'create': 6, 'partial_update': 9,
+        'destroy': 7, 'events': 4, 'facets': 7,
+    }
+
+    def get_queryset(self):
+        if self.action == 'partial_update':
+            # TitleWriteSerializer сам читает жанры после записи.
+            return super().get_queryset().prefetch_related(None)
+        return super().get_queryset()
 
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update',):
             return TitleWriteSerializer
         return TitleReadSerializer
 
+    @action(methods=['get'], detail=False)
+    def facets(self, request):
+        """
+        Число произведений по жанрам, категориям, десятилетиям
+        и диапазонам рейтинга с теми же фильтрами, что и у списка.
+        """
+        return Response(facets.cached_title_facets(
+            request.query_params,
+            self.filter_queryset(Title.objects.order_by())
+        ))
+
+    @action(
+        methods=['get'], detail=True,
+        renderer_classes=(EventStreamRenderer,)
+    )
+    def events(self, request, pk=None):
+        """
+        Server-Sent Events: создание, изменение и удаление отзывов
+        и комментариев произведения. Заголовок Last-Event-ID
+        возвращает пропущенные с этого номера события.
+        """
+        if not Title.objects.filter(pk=pk).exists():
+            raise Http404
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID', '')
+        response = StreamingHttpResponse(
+            events.stream(events.subscribe(
+                int(pk),
+                int(last_event_id) if last_event_id.isdigit() else None
+            )),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # nginx не должен копить события в буфере.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    ReadReplicaMixin,
+    RetryOnLockMixin,
+    PublishEventsMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = ReviewSerializer
     permission_classes = (IsAuthorModeratorAdminOrReadOnlyPermission,)
     http_method_names = ['get', 'patch', 'post', 'delete']
+    values_reader = ReviewReader()
+    async_reads = True
+    event_name = 'review'
+    # На запись +1 запрос: строка TitleEvent при EVENTS_BACKEND = 'database'.
+    query_budget = {
+        'list': 4, 'retrieve': 3, 'create': 6, 'partial_update': 5,
+        'destroy': 7,
+    }
 
     @lru_cache(maxsize=None)
     def get_title(self):
@@ -73,7 +170,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return get_object_or_404(Title, pk=title_id)
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.get_title().reviews.select_related('author', 'title')
 
     def perform_create(self, serializer):
         serializer.save(
@@ -82,18 +179,38 @@ class ReviewViewSet(viewsets.ModelViewSet):
         )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    ReadReplicaMixin,
+    RetryOnLockMixin,
+    PublishEventsMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = CommentSerializer
     permission_classes = (IsAuthorModeratorAdminOrReadOnlyPermission,)
     http_method_names = ['get', 'patch', 'post', 'delete']
+    values_reader = CommentReader()
+    async_reads = True
+    event_name = 'comment'
+    event_kwargs = ('review_id',)
+    # На запись +1 запрос: строка TitleEvent при EVENTS_BACKEND = 'database'.
+    query_budget = {
+        'list': 4, 'retrieve': 3, 'create': 5, 'partial_update': 5,
+        'destroy': 5,
+    }
 
     @lru_cache(maxsize=None)
     def get_review(self):
-        review_id = self.kwargs.get('review_id')
-        return get_object_or_404(Review, pk=review_id)
+        # Отзыв ищется в произведении из url: по title_id публикуются
+        # события комментариев.
+        return get_object_or_404(
+            Review,
+            pk=self.kwargs.get('review_id'),
+            title_id=self.kwargs.get('title_id')
+        )
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.get_review().comments.select_related('author')
 
     def perform_create(self, serializer):
         serializer.save(
@@ -105,36 +222,44 @@ class CommentViewSet(viewsets.ModelViewSet):
 class UserCreate(APIView):
     """Получение кода подтверждения на переданный email."""
     permission_classes = (AllowAny,)
-
-    random_code = ''.join(random.choices(
-        string.ascii_uppercase + string.digits, k=10))
+    query_budget = 2
 
     def post(self, request):
         serializer = CreateUserSerializer(data=request.data)
-        if (User.objects.filter(username=request.data.get('username'),
-                                email=request.data.get('email'))):
-            user = User.objects.get(
-                username=request.data.get('username'))
-            serializer = CreateUserSerializer(user, data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(confirmation_code=self.random_code)
-        user = User.objects.get(username=request.data.get('username'))
-        send_mail(
-            subject='Код подтверждения для доступа к API YaMDb.',
-            message=(
-                f'Ваш код подтверждения: {user.confirmation_code}\n'
-            ),
-            from_email=EMAIL_HOST_USER,
-            recipient_list=[request.data.get('email')],
-            fail_silently=False,
-        )
+        try:
+            user = self.save_user(serializer)
+        except IntegrityError:
+            raise ValidationError(
+                'Пользователь с таким username или email уже существует.'
+            )
+        with metrics.in_progress('yamdb_email_queue_depth'):
+            send_mail(
+                subject='Код подтверждения для доступа к API YaMDb.',
+                message=(
+                    f'Ваш код подтверждения: {user.confirmation_code}\n'
+                ),
+                from_email=EMAIL_HOST_USER,
+                recipient_list=[user.email],
+                fail_silently=False,
+            )
         return Response(
             serializer.data, status=HTTP_200_OK
         )
 
+    @retry_on_lock(atomic=False)
+    def save_user(self, serializer):
+        """
+        Запись отдельно от отправки письма: транзакция не держит
+        блокировку SQLite, пока идёт обмен с SMTP-сервером.
+        """
+        return serializer.save(confirmation_code=''.join(random.choices(
+            string.ascii_uppercase + string.digits, k=10)))
+
 
 class UserGetToken(APIView):
     permission_classes = (permissions.AllowAny,)
+    query_budget = 1
 
     def post(self, request):
         serializer = TokenSerializer(data=request.data)
@@ -157,7 +282,7 @@ class UserGetToken(APIView):
         )
 
 
-class UsersViewSet(viewsets.ModelViewSet):
+class UsersViewSet(RetryOnLockMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UsersSerializer
     lookup_field = 'username'
@@ -165,11 +290,16 @@ class UsersViewSet(viewsets.ModelViewSet):
     search_fields = ('username',)
     permission_classes = (IsAdminOnlyPermission,)
     http_method_names = ('get', 'post', 'patch', 'delete')
+    query_budget = {
+        'list': 3, 'retrieve': 2, 'create': 5, 'partial_update': 5,
+        'destroy': 10, 'me_user': 4, 'bulk_update': 3,
+    }
 
     @action(
         methods=['get', 'patch'], detail=False,
         url_path='me', permission_classes=(SelfEditUserOnlyPermission,)
     )
+    @retry_on_lock
     def me_user(self, request):
         if request.method == 'GET':
             user = get_object_or_404(
@@ -185,3 +315,48 @@ class UsersViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data, status=HTTP_200_OK)
+
+    @action(methods=['patch'], detail=False, url_path='bulk')
+    @retry_on_lock(atomic=False)
+    def bulk_update(self, request):
+        """
+        Изменяет поля сразу у многих пользователей одним UPDATE.
+        JWT-аутентификация читает пользователя из БД на каждом запросе,
+        поэтому новая роль и is_active действуют сразу.
+        """
+        serializer = UsersBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        usernames = serializer.validated_data['usernames']
+        found = set(
+            User.objects.filter(
+                username__in=usernames
+            ).values_list('username', flat=True)
+        )
+        if found:
+            User.objects.filter(username__in=found).update(
+                **serializer.validated_data['changes']
+            )
+        return Response(
+            {
+                'results': [
+                    {
+                        'username': username,
+                        'status': (
+                            'updated' if username in found else 'not_found'
+                        ),
+                    } for username in usernames
+                ]
+            },
+            status=HTTP_200_OK
+        )
+
+
+def metrics_view(request):
+    """
+    Метрики всех процессов в текстовом формате Prometheus. Доступны
+    только с адресов METRICS_ALLOWED_IPS, если список задан.
+    """
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
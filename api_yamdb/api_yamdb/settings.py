@@ -1,16 +1,37 @@
+import os
+import tempfile
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+
+def env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Профиль настроек: development (по умолчанию) или production.
+DJANGO_ENV = os.getenv('DJANGO_ENV', 'development')
+PRODUCTION = DJANGO_ENV == 'production'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'p&l%385148kslhtyn^##a1)ilz@4zqj=rq&agdol^##zgl9(vs'
+SECRET_KEY = os.getenv(
+    'DJANGO_SECRET_KEY',
+    '' if PRODUCTION else 'p&l%385148kslhtyn^##a1)ilz@4zqj=rq&agdol^##zgl9(vs'
+)
+if not SECRET_KEY:
+    raise ImproperlyConfigured(
+        'В production задайте переменную окружения DJANGO_SECRET_KEY.'
+    )
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# С DEBUG Django хранит каждый выполненный запрос в connection.queries.
+DEBUG = env_bool('DJANGO_DEBUG', not PRODUCTION)
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS', '*').split(',')
 
 
 # Application definition
@@ -31,6 +52,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
+    'api.middleware.ProfilingMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ServerTimingMiddleware',
+    'api.middleware.QueryCountMiddleware',
+    'api.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -40,6 +68,13 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
+# Маршруты ASGI-воркеров: чтение каталога и отзывов идёт в пуле
+# из ASYNC_READ_WORKERS потоков (api.asgi).
+ASGI_URLCONF = 'api_yamdb.urls_asgi'
+ASYNC_READ_WORKERS = int(os.getenv('ASYNC_READ_WORKERS', 8))
+# Потоки для потоковых ответов под ASGI (SSE): каждый открытый поток
+# событий занимает один поток, пока ждёт событий.
+ASYNC_STREAM_WORKERS = int(os.getenv('ASYNC_STREAM_WORKERS', 100))
 
 TEMPLATES_DIR = BASE_DIR / 'templates'
 TEMPLATES = [
@@ -59,6 +94,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
+ASGI_APPLICATION = 'api_yamdb.asgi.application'
 
 
 # Database
@@ -66,10 +102,72 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('DJANGO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+        # Постоянные соединения: PRAGMA выполняются один раз на соединение.
+        'CONN_MAX_AGE': int(
+            os.getenv('DJANGO_CONN_MAX_AGE', 600 if PRODUCTION else 0)
+        ),
+    }
+}
+
+# Реплики для чтения: пути к файлам SQLite через запятую. Для локальной
+# проверки подойдёт копия основной БД. В тестах реплики совпадают
+# с основной БД.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('DJANGO_DB_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+# После записи чтение клиента идёт с основной БД ещё столько секунд,
+# чтобы клиент видел свои изменения, пока реплика догоняет.
+REPLICA_PIN_SECONDS = 5
+
+# Выполняются для каждого нового соединения SQLite (api.db).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    # Сколько миллисекунд ждать снятия блокировки записи.
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 20_000)),
 }
 
+# Повтор записи при «database is locked»: число попыток и начальная
+# пауза в секундах, которая удваивается с каждой попыткой.
+DB_LOCK_RETRIES = 5
+DB_LOCK_BACKOFF = 0.05
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'api.metrics.MetricsLocMemCache',
+    }
+}
+
+# Метрики процессов складываются в METRICS_DIR и отдаются на /metrics.
+# Каталог свой у каждого развёртывания; перед запуском сервера его
+# очищает команда clear_metrics.
+METRICS_DIR = Path(os.getenv('METRICS_DIR', BASE_DIR / 'metrics'))
+# Адреса (REMOTE_ADDR), с которых доступен /metrics; пустой список — любые.
+# За обратным прокси REMOTE_ADDR — адрес прокси: закройте /metrics на нём.
+METRICS_ALLOWED_IPS = list(filter(None, os.getenv(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1' if PRODUCTION else ''
+).split(',')))
+# Общие для процессов версии данных (api.catalog): по ним воркеры узнают,
+# что категории и жанры изменились.
+VERSIONS_DIR = Path(tempfile.gettempdir(), 'yamdb-versions')
+# Сколько секунд хранится результат /titles/facets/ (api.facets). Кэш
+# сбрасывается и раньше — по версиям в VERSIONS_DIR.
+FACETS_CACHE_TIMEOUT = 600
+
 
 # Password validation
 
@@ -88,18 +186,81 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# application/msgpack для машинных клиентов, если установлен msgpack.
+MSGPACK_RENDERERS = (
+    ['api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []
+)
+MSGPACK_PARSERS = (
+    ['api.renderers.MessagePackParser'] if find_spec('msgpack') else []
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.TimedJWTAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+    ] + MSGPACK_RENDERERS + ([] if PRODUCTION else [
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]),
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+    ] + MSGPACK_PARSERS + [
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 10,
 }
 
+# Превышение query_budget представления или повторяющиеся SQL-запросы
+# (N+1) в режиме разработки вызывают исключение, иначе пишутся в лог.
+QUERY_BUDGET_RAISE = DEBUG
+
+# Запросы дольше SLOW_REQUEST_THRESHOLD секунд пишутся в лог api.slow
+# вместе с SQL и планами. SQL сохраняется только у доли запросов
+# SLOW_REQUEST_SAMPLE_RATE, остальные не несут накладных расходов.
+SLOW_REQUEST_THRESHOLD = 0.5
+SLOW_REQUEST_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ('console',),
+            'level': 'WARNING',
+        },
+    },
+}
+
+# Ответы меньше этого размера в байтах не сжимаются.
+COMPRESSION_MIN_SIZE = 1024
+
+# Кодирование JSON в API: orjson (если установлен) или json.
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'orjson')
+
+# SSE /titles/{id}/events/ (api.events): 'local' — события только
+# внутри процесса, 'database' — через таблицу TitleEvent между всеми
+# воркерами. Поток закрывается через EVENTS_MAX_AGE секунд, клиент
+# переподключается с Last-Event-ID.
+EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', 'local')
+EVENTS_HISTORY = 1000
+EVENTS_KEEPALIVE = 15
+EVENTS_MAX_AGE = 300
+EVENTS_RETRY_MS = 3000
+EVENTS_POLL_INTERVAL = 0.5
+EVENTS_RETENTION = 24 * 60 * 60
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=5),
     'AUTH_HEADER_TYPES': ('Bearer',),
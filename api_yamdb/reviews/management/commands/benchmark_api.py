@@ -0,0 +1,486 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from itertools import count
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import metrics
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from .generate_dataset import SCALES
+
+DEFAULT_SCALES: Tuple[str, ...] = ('tiny', 'small')
+DEFAULT_REPEAT: int = 30
+WARMUP: int = 3
+DEFAULT_TOLERANCE: float = 0.2
+MIN_REGRESSION_MS: float = 1.0
+BENCH_PASSWORD: str = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет задержку, число запросов к БД и память для каждого '
+        'эндпоинта API на синтетических данных разного размера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            default=','.join(DEFAULT_SCALES),
+            help=(
+                'Размеры набора через запятую: '
+                f'{", ".join(SCALES)}.'
+            )
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=DEFAULT_REPEAT,
+            help='Сколько раз выполнить каждый запрос.'
+        )
+        parser.add_argument(
+            '--routes',
+            help='Выполнить только эти маршруты (имена через запятую).'
+        )
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help='Файл, в который записываются результаты в JSON.'
+        )
+        parser.add_argument(
+            '--baseline',
+            type=Path,
+            help=(
+                'Результаты прошлого запуска; при регрессии команда '
+                'завершается с ошибкой.'
+            )
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=DEFAULT_TOLERANCE,
+            help='Допустимый рост p95 относительно baseline (0.2 — 20%%).'
+        )
+
+    def handle(self, *args: Union[Tuple, Any], **kwargs: Any) -> None:
+        """
+        Прогоняет маршруты на отдельной тестовой БД: рабочая база
+        не меняется. Для каждого размера данные генерируются заново.
+        """
+        scales: List[str] = kwargs['scales'].split(',')
+        unknown = set(scales) - set(SCALES)
+        if unknown:
+            raise CommandError(f'Неизвестные размеры: {", ".join(unknown)}')
+        if kwargs['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше нуля.')
+        only: Optional[set] = (
+            set(kwargs['routes'].split(',')) if kwargs['routes'] else None
+        )
+        baseline: Optional[Dict[str, Any]] = None
+        if kwargs['baseline']:
+            baseline = json.loads(kwargs['baseline'].read_text())
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with metrics.temporary_dir():
+                results: Dict[str, Any] = {
+                    scale: self.run_scale(scale, kwargs['repeat'], only)
+                    for scale in scales
+                }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report: Dict[str, Any] = {
+            'meta': {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'repeat': kwargs['repeat'],
+            },
+            'results': results,
+        }
+        if kwargs['output']:
+            kwargs['output'].write_text(
+                json.dumps(report, ensure_ascii=False, indent=2)
+            )
+        if baseline is not None:
+            regressions = compare(baseline, report, kwargs['tolerance'])
+            for line in regressions:
+                self.stderr.write(line)
+            if regressions:
+                raise CommandError(
+                    f'Найдено регрессий: {len(regressions)}.'
+                )
+            self.stdout.write('Регрессий относительно baseline нет.')
+
+    def run_scale(
+        self,
+        scale: str,
+        repeat: int,
+        only: Optional[set]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Заполняет БД набором scale и измеряет все маршруты.
+        """
+        load_scale(scale)
+        self.stdout.write(f'== {scale}: {Review.objects.count()} отзывов')
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, request in self.routes(WARMUP + repeat + 2):
+            if only is not None and name not in only:
+                continue
+            results[name] = measure(request, repeat)
+            self.stdout.write(
+                f'{name:<28} p50 {results[name]["p50_ms"]:8.2f} мс  '
+                f'p95 {results[name]["p95_ms"]:8.2f} мс  '
+                f'запросов {results[name]["queries"]:4}  '
+                f'память {results[name]["peak_kb"]:8.1f} КБ  '
+                f'ответ {results[name]["bytes"]:8} Б  '
+                f'[{results[name]["status"]}]'
+            )
+        return results
+
+    def routes(self, calls: int) -> List[Tuple[str, Callable[[], Any]]]:
+        """
+        Запросы ко всем маршрутам api/urls.py. Объекты для детальных
+        маршрутов выбираются самые «тяжёлые»: произведение с наибольшим
+        числом отзывов, отзыв с наибольшим числом комментариев.
+        Маршруты записи идут последними, чтобы не менять данные для
+        чтения; каждый вызов создаёт или удаляет новый объект, calls —
+        сколько раз measure() вызывает запрос.
+        """
+        admin = User.objects.create_user(
+            username='bench_admin', email='bench_admin@yamdb.fake',
+            password=BENCH_PASSWORD, role=User.ADMIN
+        )
+        admin_client = APIClient()
+        admin_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}'
+        )
+        anon = APIClient()
+        token_user = User.objects.create_user(
+            username='bench_token', email='bench_token@yamdb.fake',
+            confirmation_code='BENCH12345'
+        )
+        title = Title.objects.annotate(
+            reviews_count=Count('reviews')
+        ).order_by('-reviews_count').first()
+        review = Review.objects.annotate(
+            comments_count=Count('comments')
+        ).order_by('-comments_count').first()
+        comment = review.comments.first()
+        category = Category.objects.first()
+        genre = Genre.objects.first()
+        genre_slugs = list(
+            Genre.objects.order_by('id').values_list('slug', flat=True)[:3]
+        )
+        category_slugs = list(
+            Category.objects.order_by('id').values_list('slug', flat=True)[:2]
+        )
+        user = User.objects.exclude(pk__in=(admin.pk, token_user.pk)).first()
+        usernames = list(User.objects.exclude(
+            pk__in=(admin.pk, token_user.pk)
+        ).order_by('id').values_list('username', flat=True)[:50])
+        signups = count()
+        numbers = count()
+
+        def signup() -> Any:
+            number = next(signups)
+            return anon.post('/api/v1/auth/signup/', {
+                'username': f'bench_signup_{number}',
+                'email': f'bench_signup_{number}@yamdb.fake',
+            })
+
+        def user_data() -> Dict[str, str]:
+            number = next(numbers)
+            return {
+                'username': f'bench_user_{number}',
+                'email': f'bench_user_{number}@yamdb.fake',
+            }
+
+        def create_title() -> Title:
+            created = Title.objects.create(
+                name=f'bench_title_{next(numbers)}', year=2000,
+                category=category
+            )
+            created.genre.set(Genre.objects.filter(slug__in=genre_slugs))
+            return created
+
+        bench_title = create_title()
+        bench_review = Review.objects.create(
+            title=bench_title, author=admin, text='Отзыв', score=5
+        )
+        bench_comment = Comment.objects.create(
+            review=review, author=admin, text='Комментарий'
+        )
+        new_titles = pool(create_title, calls)
+        new_reviews = pool(lambda: Review.objects.create(
+            title=create_title(), author=admin, text='Отзыв', score=5
+        ), calls)
+        new_comments = pool(lambda: Comment.objects.create(
+            review=review, author=admin, text='Комментарий'
+        ), calls)
+        new_categories = pool(lambda: Category.objects.create(
+            name='bench', slug=f'bench-category-{next(numbers)}'
+        ), calls)
+        new_genres = pool(lambda: Genre.objects.create(
+            name='bench', slug=f'bench-genre-{next(numbers)}'
+        ), calls)
+        new_users = pool(
+            lambda: User.objects.create_user(**user_data()), calls
+        )
+        bench_reviews_url = f'/api/v1/titles/{bench_title.id}/reviews/'
+
+        reviews_url = f'/api/v1/titles/{review.title_id}/reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        return [
+            ('categories-list', lambda: anon.get('/api/v1/categories/')),
+            ('categories-search', lambda: anon.get(
+                '/api/v1/categories/', {'search': category.name[:3]}
+            )),
+            ('genres-list', lambda: anon.get('/api/v1/genres/')),
+            ('genres-search', lambda: anon.get(
+                '/api/v1/genres/', {'search': genre.name[:3]}
+            )),
+            ('titles-list', lambda: anon.get('/api/v1/titles/')),
+            ('titles-list-500', lambda: anon.get(
+                '/api/v1/titles/', {'limit': 500}
+            )),
+            ('titles-list-500-msgpack', lambda: anon.get(
+                '/api/v1/titles/', {'limit': 500},
+                HTTP_ACCEPT='application/msgpack'
+            )),
+            ('titles-list-genre', lambda: anon.get(
+                '/api/v1/titles/', {'genre': genre.slug}
+            )),
+            ('titles-list-genres-any', lambda: anon.get(
+                '/api/v1/titles/', {'genre': ','.join(genre_slugs)}
+            )),
+            ('titles-list-genres-all', lambda: anon.get(
+                '/api/v1/titles/',
+                {'genre': ','.join(genre_slugs[:2]), 'genre_mode': 'all'}
+            )),
+            ('titles-list-category', lambda: anon.get(
+                '/api/v1/titles/', {'category': category.slug}
+            )),
+            ('titles-list-categories', lambda: anon.get(
+                '/api/v1/titles/', {'category': ','.join(category_slugs)}
+            )),
+            ('titles-facets', lambda: anon.get('/api/v1/titles/facets/')),
+            ('titles-facets-genre', lambda: anon.get(
+                '/api/v1/titles/facets/', {'genre': genre.slug}
+            )),
+            ('titles-list-name', lambda: anon.get(
+                '/api/v1/titles/', {'name': title.name}
+            )),
+            ('titles-list-year', lambda: anon.get(
+                '/api/v1/titles/', {'year': title.year}
+            )),
+            ('titles-detail', lambda: anon.get(
+                f'/api/v1/titles/{title.id}/'
+            )),
+            ('reviews-list', lambda: anon.get(
+                f'/api/v1/titles/{title.id}/reviews/'
+            )),
+            ('reviews-detail', lambda: anon.get(f'{reviews_url}{review.id}/')),
+            ('comments-list', lambda: anon.get(comments_url)),
+            ('comments-detail', lambda: anon.get(
+                f'{comments_url}{comment.id}/'
+            )),
+            ('users-list', lambda: admin_client.get('/api/v1/users/')),
+            ('users-detail', lambda: admin_client.get(
+                f'/api/v1/users/{user.username}/'
+            )),
+            ('users-me', lambda: admin_client.get('/api/v1/users/me/')),
+            ('signup', signup),
+            ('token', lambda: anon.post('/api/v1/auth/token/', {
+                'username': token_user.username,
+                'confirmation_code': token_user.confirmation_code,
+            })),
+            ('categories-create', lambda: admin_client.post(
+                '/api/v1/categories/',
+                {'name': 'bench', 'slug': f'bench-new-{next(numbers)}'}
+            )),
+            ('categories-delete', lambda: admin_client.delete(
+                f'/api/v1/categories/{new_categories().slug}/'
+            )),
+            ('genres-create', lambda: admin_client.post(
+                '/api/v1/genres/',
+                {'name': 'bench', 'slug': f'bench-new-{next(numbers)}'}
+            )),
+            ('genres-delete', lambda: admin_client.delete(
+                f'/api/v1/genres/{new_genres().slug}/'
+            )),
+            ('titles-create', lambda: admin_client.post('/api/v1/titles/', {
+                'name': f'bench_title_{next(numbers)}', 'year': 2000,
+                'category': category.slug, 'genre': genre_slugs,
+            }, format='json')),
+            ('titles-patch', lambda: admin_client.patch(
+                f'/api/v1/titles/{bench_title.id}/', {
+                    'name': f'bench_title_{next(numbers)}',
+                    'genre': genre_slugs[next(numbers) % 2:],
+                }, format='json'
+            )),
+            ('titles-delete', lambda: admin_client.delete(
+                f'/api/v1/titles/{new_titles().id}/'
+            )),
+            ('reviews-create', lambda: admin_client.post(
+                f'/api/v1/titles/{new_titles().id}/reviews/',
+                {'text': 'Отзыв', 'score': 7}
+            )),
+            ('reviews-patch', lambda: admin_client.patch(
+                f'{bench_reviews_url}{bench_review.id}/',
+                {'score': next(numbers) % 10 + 1}
+            )),
+            ('reviews-delete', lambda: delete_review(
+                admin_client, new_reviews()
+            )),
+            ('comments-create', lambda: admin_client.post(
+                comments_url, {'text': 'Комментарий'}
+            )),
+            ('comments-patch', lambda: admin_client.patch(
+                f'{comments_url}{bench_comment.id}/',
+                {'text': f'Комментарий {next(numbers)}'}
+            )),
+            ('comments-delete', lambda: admin_client.delete(
+                f'{comments_url}{new_comments().id}/'
+            )),
+            ('users-create', lambda: admin_client.post(
+                '/api/v1/users/', user_data()
+            )),
+            ('users-patch', lambda: admin_client.patch(
+                f'/api/v1/users/{user.username}/',
+                {'bio': f'bench {next(numbers)}'}
+            )),
+            ('users-bulk', lambda: admin_client.patch(
+                '/api/v1/users/bulk/',
+                {'usernames': usernames, 'bio': f'bench {next(numbers)}'},
+                format='json'
+            )),
+            ('users-delete', lambda: admin_client.delete(
+                f'/api/v1/users/{new_users().username}/'
+            )),
+        ]
+
+
+def pool(create: Callable[[], Any], size: int) -> Callable[[], Any]:
+    """
+    Выдаёт новый объект на каждый вызов. Объекты создаются пачкой
+    по size при первом вызове — в прогреве measure(), вне замера.
+    """
+    objects: List[Any] = []
+
+    def take() -> Any:
+        if not objects:
+            objects.extend(create() for _ in range(size))
+        return objects.pop()
+
+    return take
+
+
+def delete_review(client: APIClient, review: Review) -> Any:
+    return client.delete(
+        f'/api/v1/titles/{review.title_id}/reviews/{review.id}/'
+    )
+
+
+def load_scale(scale: str) -> None:
+    """Очищает БД и загружает синтетический набор размера scale."""
+    call_command('flush', interactive=False, verbosity=0)
+    with tempfile.TemporaryDirectory() as directory:
+        call_command(
+            'generate_dataset', path=directory, scale=scale,
+            stdout=StringIO()
+        )
+        call_command(
+            'import_csv', path=directory, workers=1, stdout=StringIO()
+        )
+
+
+def measure(request: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """
+    Время выполнения запроса (p50/p95/среднее), число SQL-запросов,
+    размер ответа и пик выделенной памяти. Память меряется отдельным
+    прогоном: tracemalloc заметно замедляет код.
+    """
+    for _ in range(WARMUP):
+        request()
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = request()
+        timings.append((time.perf_counter() - started) * 1000)
+    queries: List[str] = []
+
+    def record(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    # CaptureQueriesContext не подходит: request_started сбрасывает
+    # connection.queries_log посреди замера.
+    with connection.execute_wrapper(record):
+        request()
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    timings.sort()
+    return {
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1,
+                                    int(len(timings) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': len(queries),
+        'peak_kb': round(peak / 1024, 1),
+        'bytes': len(response.content),
+    }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    report: Dict[str, Any],
+    tolerance: float
+) -> List[str]:
+    """
+    Сравнивает результаты с baseline: регрессия — рост p95 больше чем
+    на tolerance (и больше MIN_REGRESSION_MS) или рост числа запросов.
+    """
+    regressions: List[str] = []
+    for scale, routes in report['results'].items():
+        for name, current in routes.items():
+            previous = baseline.get('results', {}).get(scale, {}).get(name)
+            if previous is None:
+                continue
+            limit = previous['p95_ms'] * (1 + tolerance)
+            if (
+                current['p95_ms'] > limit
+                and current['p95_ms'] - previous['p95_ms'] > MIN_REGRESSION_MS
+            ):
+                regressions.append(
+                    f'{scale}/{name}: p95 {previous["p95_ms"]} → '
+                    f'{current["p95_ms"]} мс'
+                )
+            if current['queries'] > previous['queries']:
+                regressions.append(
+                    f'{scale}/{name}: запросов {previous["queries"]} → '
+                    f'{current["queries"]}'
+                )
+    return regressions
@@ -0,0 +1,19 @@
+from typing import Any, Tuple, Union
+
+from django.core.management.base import BaseCommand
+
+from api import metrics
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет файлы метрик процессов из METRICS_DIR. Запускается '
+        'перед стартом сервера, как очистка каталога в multiprocess-режиме '
+        'prometheus_client.'
+    )
+
+    def handle(self, *args: Union[Tuple, Any], **kwargs: Any) -> None:
+        removed = metrics.clear()
+        self.stdout.write(
+            f'{metrics.metrics_dir()}: удалено файлов {removed}'
+        )
@@ -0,0 +1,147 @@
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+import csv
+import gzip
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from reviews.models import Comment, Review, User
+from .import_csv import FILE_HANDLE, PROGRESS_INTERVAL
+
+DEFAULT_CHUNK_SIZE: int = 2000
+PROGRESS_CHECK_ROWS: int = 1000
+EXPORT_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'category.csv': ('id', 'name', 'slug'),
+    'genre.csv': ('id', 'name', 'slug'),
+    'users.csv': (
+        'id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'
+    ),
+    'titles.csv': ('id', 'name', 'year', 'category', 'description'),
+    'genre_title.csv': ('id', 'title_id', 'genre_id'),
+    'review.csv': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'comments.csv': ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+SINCE_FIELDS: Dict[Any, str] = {
+    User: 'date_joined',
+    Review: 'pub_date',
+    Comment: 'pub_date',
+}
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка данных в csv-файлы в формате команды import_csv.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            type=Path,
+            required=True,
+            help='Каталог, в который записываются csv-файлы.'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать файлы: category.csv.gz и т.д.'
+        )
+        parser.add_argument(
+            '--since',
+            help=(
+                'Выгрузить только пользователей, отзывы и комментарии, '
+                'созданные начиная с этой даты (ISO 8601). Остальные '
+                'таблицы выгружаются полностью.'
+            )
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Количество строк, читаемых из БД за один запрос.'
+        )
+
+    def handle(self, *args: Union[Tuple, Any], **kwargs: Any) -> None:
+        """
+        Выгружает модели в csv, потоково читая строки через iterator().
+        """
+        since: Optional[datetime] = self.parse_since(kwargs['since'])
+        directory = Path(kwargs['path'])
+        directory.mkdir(parents=True, exist_ok=True)
+        for file, model, replace in FILE_HANDLE:
+            queryset = model.objects.order_by('pk')
+            if since and model in SINCE_FIELDS:
+                queryset = queryset.filter(
+                    **{f'{SINCE_FIELDS[model]}__gte': since}
+                )
+            columns: Tuple[str, ...] = EXPORT_COLUMNS[file]
+            values = queryset.values_list(
+                *(replace.get(column, column) for column in columns)
+            ).iterator(chunk_size=kwargs['chunk_size'])
+            path = Path(directory, file)
+            if kwargs['gzip']:
+                path = path.with_name(f'{file}.gz')
+            self.write_file(path, columns, values, kwargs['gzip'])
+
+    def parse_since(self, value: Optional[str]) -> Optional[datetime]:
+        """
+        Разбирает --since: дату или дату со временем.
+        """
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'Неверная дата --since: {value}')
+            since = datetime(day.year, day.month, day.day)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+        return since
+
+    def write_file(
+        self,
+        path: Path,
+        columns: Tuple[str, ...],
+        values: Iterator[Tuple[Any, ...]],
+        compress: bool
+    ) -> None:
+        """
+        Записывает строки в файл по мере чтения из БД.
+        """
+        started: float = time.monotonic()
+        reported: float = started
+        rows: int = 0
+        opener: Any = gzip.open if compress else open
+        with opener(path, mode='wt', encoding='utf8', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            for row in values:
+                writer.writerow(tuple(map(to_csv, row)))
+                rows += 1
+                if rows % PROGRESS_CHECK_ROWS:
+                    continue
+                now = time.monotonic()
+                if now - reported >= PROGRESS_INTERVAL:
+                    reported = now
+                    self.report(path, rows, now - started)
+        self.report(path, rows, time.monotonic() - started)
+
+    def report(self, path: Path, rows: int, elapsed: float) -> None:
+        self.stdout.write(
+            f'{path.name}: {rows} строк, '
+            f'{rows / elapsed if elapsed else rows:.0f} строк/с'
+        )
+
+
+def to_csv(value: Any) -> Any:
+    """
+    Значение в виде, который читает import_csv: даты в ISO 8601 с Z,
+    NULL — пустой строкой.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat().replace('+00:00', 'Z')
+    return value
@@ -0,0 +1,300 @@
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+import csv
+import gzip
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.models import User
+from .export_csv import EXPORT_COLUMNS
+
+SCALES: Dict[str, Dict[str, int]] = {
+    'tiny': {
+        'users': 200, 'titles': 50, 'reviews': 1000, 'comments': 300,
+    },
+    'small': {
+        'users': 10_000, 'titles': 2_000, 'reviews': 100_000,
+        'comments': 30_000,
+    },
+    'medium': {
+        'users': 100_000, 'titles': 20_000, 'reviews': 2_000_000,
+        'comments': 500_000,
+    },
+    'large': {
+        'users': 1_000_000, 'titles': 200_000, 'reviews': 20_000_000,
+        'comments': 5_000_000,
+    },
+}
+CATEGORIES: Tuple[Tuple[str, str], ...] = (
+    ('Фильм', 'movie'),
+    ('Книга', 'book'),
+    ('Музыка', 'music'),
+    ('Сериал', 'series'),
+    ('Игра', 'game'),
+)
+GENRES: Tuple[Tuple[str, str], ...] = (
+    ('Драма', 'drama'),
+    ('Комедия', 'comedy'),
+    ('Вестерн', 'western'),
+    ('Фэнтези', 'fantasy'),
+    ('Фантастика', 'sci-fi'),
+    ('Детектив', 'detective'),
+    ('Триллер', 'thriller'),
+    ('Сказка', 'tale'),
+    ('Гонзо', 'gonzo'),
+    ('Роман', 'roman'),
+    ('Баллада', 'ballad'),
+    ('Rock-n-roll', 'rock-n-roll'),
+    ('Классика', 'classical'),
+    ('Рок', 'rock'),
+    ('Шансон', 'chanson'),
+)
+WORDS: Tuple[str, ...] = (
+    'сюжет', 'актёры', 'финал', 'музыка', 'диалоги', 'режиссёр', 'герой',
+    'атмосфера', 'темп', 'сценарий', 'оператор', 'начало', 'середина',
+    'отлично', 'скучно', 'затянуто', 'ярко', 'неожиданно', 'спорно',
+    'пересмотрю', 'советую', 'не', 'очень', 'слишком', 'совсем',
+)
+ROLE_WEIGHTS: Tuple[Tuple[str, int], ...] = (
+    (User.USER, 980),
+    (User.MODERATOR, 15),
+    (User.ADMIN, 5),
+)
+SCORE_WEIGHTS: Tuple[int, ...] = (2, 1, 2, 3, 5, 8, 12, 18, 20, 15)
+TEXT_POOL_SIZE: int = 1000
+DATE_POOL_SIZE: int = 10_000
+BATCH: int = 50_000
+END_DATE: date = date(2024, 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетический набор csv-файлов в формате import_csv '
+        'заданного размера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            type=Path,
+            required=True,
+            help='Каталог, в который записываются csv-файлы.'
+        )
+        parser.add_argument(
+            '--scale',
+            choices=tuple(SCALES),
+            default='tiny',
+            help='Готовый размер набора; отдельные ключи ниже его уточняют.'
+        )
+        for name in ('users', 'titles', 'reviews', 'comments'):
+            parser.add_argument(f'--{name}', type=int)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.0,
+            help=(
+                'Показатель закона Ципфа для популярности произведений: '
+                '0 — равномерно, больше — сильнее перекос.'
+            )
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора: одинаковое зерно даёт одинаковые файлы.'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать файлы: review.csv.gz и т.д.'
+        )
+
+    def handle(self, *args: Union[Tuple, Any], **kwargs: Any) -> None:
+        """
+        Пишет category.csv ... comments.csv. Популярность произведений
+        распределена по закону Ципфа, пара (произведение, автор) в отзывах
+        уникальна, как требует ограничение unique_title_author.
+        """
+        sizes: Dict[str, int] = {
+            name: kwargs[name] if kwargs[name] is not None else value
+            for name, value in SCALES[kwargs['scale']].items()
+        }
+        if min(sizes.values()) < 0 or not sizes['users'] or not (
+            sizes['titles']
+        ):
+            raise CommandError(
+                'Нужен хотя бы один пользователь и одно произведение.'
+            )
+        self.rng = random.Random(kwargs['seed'])
+        self.directory = Path(kwargs['path'])
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compress: bool = kwargs['gzip']
+        self.texts: List[str] = [
+            ' '.join(self.rng.choices(WORDS, k=self.rng.randint(5, 40)))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        self.dates: List[str] = self.date_pool()
+        users, titles = sizes['users'], sizes['titles']
+
+        self.write('category.csv', (
+            (pk, name, slug) for pk, (name, slug) in enumerate(CATEGORIES, 1)
+        ))
+        self.write('genre.csv', (
+            (pk, name, slug) for pk, (name, slug) in enumerate(GENRES, 1)
+        ))
+        self.write('users.csv', self.users(users))
+        self.write('titles.csv', self.titles(titles))
+        self.write('genre_title.csv', self.genre_titles(titles))
+        counts: List[int] = self.review_counts(
+            sizes['reviews'], titles, users, kwargs['skew']
+        )
+        reviews: int = self.write('review.csv', self.reviews(counts, users))
+        self.write('comments.csv', self.comments(
+            sizes['comments'] if reviews else 0, reviews, users
+        ))
+
+    def write(self, file: str, rows: Iterable[Tuple[Any, ...]]) -> int:
+        """
+        Записывает строки пакетами через writerows и возвращает их число.
+        """
+        started: float = time.monotonic()
+        path = Path(self.directory, file)
+        opener: Any = open
+        if self.compress:
+            path, opener = path.with_name(f'{file}.gz'), gzip.open
+        count: int = 0
+        with opener(path, mode='wt', encoding='utf8', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(EXPORT_COLUMNS[file])
+            batch: List[Tuple[Any, ...]] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= BATCH:
+                    writer.writerows(batch)
+                    count += len(batch)
+                    batch.clear()
+            writer.writerows(batch)
+            count += len(batch)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{path.name}: {count} строк, '
+            f'{count / elapsed if elapsed else count:.0f} строк/с'
+        )
+        return count
+
+    def date_pool(self) -> List[str]:
+        """
+        Отсортированный набор дат публикации за десять лет до END_DATE.
+        """
+        end = datetime.combine(END_DATE, datetime.min.time(),
+                               tzinfo=timezone.utc)
+        span = int(timedelta(days=3650).total_seconds())
+        return [
+            (end - timedelta(seconds=offset)).isoformat().replace(
+                '+00:00', 'Z'
+            )
+            for offset in sorted(
+                self.rng.sample(range(span), DATE_POOL_SIZE), reverse=True
+            )
+        ]
+
+    def users(self, count: int) -> Iterator[Tuple[Any, ...]]:
+        roles, weights = zip(*ROLE_WEIGHTS)
+        cum_weights = list(accumulate(weights))
+        for start in range(1, count + 1, BATCH):
+            stop = min(start + BATCH, count + 1)
+            for pk, role in zip(
+                range(start, stop),
+                self.rng.choices(roles, cum_weights=cum_weights,
+                                 k=stop - start)
+            ):
+                yield (
+                    pk, f'user{pk}', f'user{pk}@yamdb.fake', role, '', '', ''
+                )
+
+    def titles(self, count: int) -> Iterator[Tuple[Any, ...]]:
+        for start in range(1, count + 1, BATCH):
+            stop = min(start + BATCH, count + 1)
+            size = stop - start
+            for pk, year, category, text in zip(
+                range(start, stop),
+                self.rng.choices(range(1900, END_DATE.year + 1), k=size),
+                self.rng.choices(range(1, len(CATEGORIES) + 1), k=size),
+                self.rng.choices(self.texts, k=size),
+            ):
+                yield pk, f'Произведение {pk}', year, category, text
+
+    def genre_titles(self, count: int) -> Iterator[Tuple[int, int, int]]:
+        genres = range(1, len(GENRES) + 1)
+        pk = 0
+        for title in range(1, count + 1):
+            for genre in self.rng.sample(genres, self.rng.randint(1, 3)):
+                pk += 1
+                yield pk, title, genre
+
+    def review_counts(
+        self,
+        total: int,
+        titles: int,
+        users: int,
+        skew: float
+    ) -> List[int]:
+        """
+        Число отзывов на каждое произведение по закону Ципфа. Ранги
+        перемешаны, чтобы популярными были не только первые id. Одно
+        произведение не может получить больше отзывов, чем пользователей.
+        """
+        weights = [1 / rank ** skew for rank in range(1, titles + 1)]
+        scale = total / sum(weights)
+        counts = [min(int(weight * scale), users) for weight in weights]
+        remainder = total - sum(counts)
+        for rank in range(titles):
+            if remainder <= 0:
+                break
+            extra = min(users - counts[rank], remainder)
+            counts[rank] += extra
+            remainder -= extra
+        self.rng.shuffle(counts)
+        return counts
+
+    def reviews(
+        self,
+        counts: List[int],
+        users: int
+    ) -> Iterator[Tuple[Any, ...]]:
+        scores = range(1, 11)
+        score_weights = list(accumulate(SCORE_WEIGHTS))
+        authors = range(1, users + 1)
+        pk = 0
+        for title, count in enumerate(counts, 1):
+            if not count:
+                continue
+            for author, score, text, pub_date in zip(
+                self.rng.sample(authors, count),
+                self.rng.choices(scores, cum_weights=score_weights, k=count),
+                self.rng.choices(self.texts, k=count),
+                self.rng.choices(self.dates, k=count),
+            ):
+                pk += 1
+                yield pk, title, text, author, score, pub_date
+
+    def comments(
+        self,
+        count: int,
+        reviews: int,
+        users: int
+    ) -> Iterator[Tuple[Any, ...]]:
+        for start in range(1, count + 1, BATCH):
+            stop = min(start + BATCH, count + 1)
+            size = stop - start
+            yield from zip(
+                range(start, stop),
+                self.rng.choices(range(1, reviews + 1), k=size),
+                self.rng.choices(self.texts, k=size),
+                self.rng.choices(range(1, users + 1), k=size),
+                self.rng.choices(self.dates, k=size),
+            )
@@ -1,60 +1,687 @@
-from typing import Dict, Any, Tuple, Optional, Union
+from typing import (Dict, Any, Iterable, Iterator, List, Tuple, Optional,
+                    Union)
 import csv
+import gzip
+import hashlib
+import io
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                wait)
+from graphlib import TopologicalSorter
+from itertools import islice
 from pathlib import Path
 
-from django.core.management.base import BaseCommand
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from api.catalog import invalidate_all
+from reviews.models import (Category, Comment, Genre, ImportFileState,
+                            ImportRowState, Review, Title, User)
+
+CSV_DIR: Path = Path('static', 'data')
+DEFAULT_BATCH_SIZE: int = 1000
+# Размер участка файла, который разбирает один процесс пула.
+RANGE_BYTES: int = 1 << 20
+READ_BLOCK: int = 1 << 20
+PROGRESS_INTERVAL: float = 1.0
+MODE_INSERT: str = 'insert'
+MODE_UPSERT: str = 'upsert'
+FILE_HANDLE: Tuple[Tuple[str, Any, Dict[str, Optional[str]]], ...] = (
+    ('category.csv', Category, {}),
+    ('genre.csv', Genre, {}),
+    ('users.csv', User, {}),
+    ('titles.csv', Title, {'category': 'category_id'}),
+    ('genre_title.csv', Title.genre.through, {}),
+    ('review.csv', Review, {'author': 'author_id'}),
+    ('comments.csv', Comment, {'author': 'author_id'}),
+)
+FILE_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    'category.csv': (),
+    'genre.csv': (),
+    'users.csv': (),
+    'titles.csv': ('category.csv',),
+    'genre_title.csv': ('titles.csv', 'genre.csv'),
+    'review.csv': ('titles.csv', 'users.csv'),
+    'comments.csv': ('review.csv', 'users.csv'),
+}
 
 
 class Command(BaseCommand):
     help = 'Импорт данных из файлов в модели django.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            type=Path,
+            default=CSV_DIR,
+            help='Каталог с csv-файлами.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество строк, читаемых и сохраняемых за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=(MODE_INSERT, MODE_UPSERT),
+            default=MODE_INSERT,
+            help=(
+                'insert — добавить только новые строки; upsert — '
+                'пропустить неизменённые файлы и строки, изменённые '
+                'строки перезаписать.'
+            )
+        )
+        parser.add_argument(
+            '--fast',
+            action='store_true',
+            help=(
+                'Только для SQLite: на время загрузки включить '
+                'journal_mode=WAL и synchronous=OFF, удалить неуникальные '
+                'индексы загружаемых таблиц и пересоздать их в конце.'
+            )
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help=(
+                'Количество процессов, читающих и разбирающих участки '
+                'несжатых csv-файлов. При значении 1 всё выполняется '
+                'в текущем процессе.'
+            )
+        )
+
     def handle(self, *args: Union[Tuple, Any], **kwargs: Any) -> None:
         """
         Импортирует данные из csv в модель.
+        Файлы загружаются в порядке зависимостей FILE_DEPENDENCIES:
+        независимые файлы разбираются параллельно в пуле процессов,
+        а в БД пишет только текущий процесс.
+        """
+        if kwargs['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        if kwargs['workers'] < 1:
+            raise CommandError('--workers должен быть больше нуля.')
+        handles: Dict[str, Tuple[Any, Dict[str, Optional[str]]]] = {
+            file: (model, replace) for file, model, replace in FILE_HANDLE
+        }
+        upsert: bool = kwargs['mode'] == MODE_UPSERT
+        sorter = TopologicalSorter(FILE_DEPENDENCIES)
+        sorter.prepare()
+        with self.get_executor(kwargs['workers']) as executor, \
+                self.fast_load(kwargs['fast']):
+            while sorter.is_active():
+                ready: Tuple[str, ...] = sorter.get_ready()
+                imports: List[FileImport] = []
+                for file in ready:
+                    file_import = FileImport(
+                        Path(kwargs['path']), file, *handles[file], upsert,
+                        parallel=kwargs['workers'] > 1
+                    )
+                    if upsert and file_import.unchanged():
+                        file_import.close()
+                        self.stdout.write(f'{file}: без изменений')
+                        continue
+                    imports.append(file_import)
+                self.import_files(
+                    executor,
+                    imports,
+                    kwargs['batch_size'],
+                    kwargs['workers'] * 2
+                )
+                sorter.done(*ready)
+        # bulk_create не отправляет post_save.
+        invalidate_all()
+
+    def get_executor(self, workers: int) -> Any:
+        """
+        Возвращает пул процессов или исполнитель в текущем процессе.
         """
-        CSV_DIR: Path = Path('static', 'data')
-        FILE_HANDLE: Tuple[Tuple[str, Any, Dict[str, Optional[str]]], ...] = (
-            ('category.csv', Category, {}),
-            ('genre.csv', Genre, {}),
-            ('users.csv', User, {}),
-            ('titles.csv', Title, {'category': 'category_id'}),
-            ('genre_title.csv', Title.genre.through, {}),
-            ('review.csv', Review, {'author': 'author_id'}),
-            ('comments.csv', Comment, {'author': 'author_id'}),
-        )
-        for file, model, replace in FILE_HANDLE:
-            with open(
-                Path(CSV_DIR, file),
-                mode='r',
-                encoding='utf8'
-            ) as file_handle:
-                reader = csv.DictReader(file_handle)
-                objects_to_create: list[Any] = [
-                    self.retrieve_model_instance(
-                        row,
-                        model,
-                        replace
-                    ) for row in reader
-                ]
-                model.objects.bulk_create(
-                    objects_to_create,
+        if workers == 1:
+            return InlineExecutor()
+        connections.close_all()
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=setup_worker
+        )
+
+    @contextmanager
+    def fast_load(self, enabled: bool) -> Iterator[None]:
+        """
+        Режим массовой загрузки SQLite. Уникальные индексы остаются:
+        на них держится ignore_conflicts. Прежние настройки журнала
+        восстанавливаются, индексы пересоздаются даже при ошибке.
+        """
+        connection = connections['default']
+        if not enabled:
+            yield
+            return
+        if connection.vendor != 'sqlite':
+            self.stderr.write('--fast поддерживается только для SQLite.')
+            yield
+            return
+        tables: List[str] = [
+            model._meta.db_table for _, model, _ in FILE_HANDLE
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode: str = cursor.fetchone()[0]
+            cursor.execute('PRAGMA synchronous')
+            synchronous: int = cursor.fetchone()[0]
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=OFF')
+            cursor.execute(
+                'SELECT name, sql FROM sqlite_master '
+                'WHERE type = \'index\' AND sql IS NOT NULL '
+                'AND sql NOT LIKE \'CREATE UNIQUE%%\' '
+                f'AND tbl_name IN ({", ".join("%s" for _ in tables)})',
+                tables
+            )
+            indexes: List[Tuple[str, str]] = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+        try:
+            yield
+        finally:
+            started = time.monotonic()
+            with connection.cursor() as cursor:
+                for _, sql in indexes:
+                    cursor.execute(sql)
+                cursor.execute('ANALYZE')
+                cursor.execute(f'PRAGMA synchronous={int(synchronous)}')
+                cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+            self.stdout.write(
+                f'Индексы пересозданы ({len(indexes)}), ANALYZE выполнен '
+                f'за {time.monotonic() - started:.1f} с'
+            )
+
+    def import_files(
+        self,
+        executor: Any,
+        imports: List['FileImport'],
+        batch_size: int,
+        max_pending: int
+    ) -> None:
+        """
+        Загружает группу независимых файлов. Задачи разбора (участки
+        файлов или порции строк) по очереди отправляются в пул, готовые
+        строки сохраняются по мере поступления порциями по batch_size;
+        в работе не больше max_pending задач.
+        """
+        sources = deque(imports)
+        pending: Dict[Future, FileImport] = {}
+        try:
+            while sources or pending:
+                while sources and len(pending) < max_pending:
+                    file_import = sources.popleft()
+                    task = file_import.next_task(batch_size)
+                    if task is None:
+                        file_import.close()
+                        if not file_import.in_flight:
+                            file_import.finish()
+                            self.report(file_import, final=True)
+                        continue
+                    file_import.in_flight += 1
+                    pending[executor.submit(*task)] = file_import
+                    sources.append(file_import)
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_import = pending.pop(future)
+                    file_import.in_flight -= 1
+                    chunk = build_instances(
+                        file_import.model, *future.result()
+                    )
+                    for part in split(chunk, batch_size):
+                        self.save_chunk(file_import, part, batch_size)
+                    if file_import.closed and not file_import.in_flight:
+                        file_import.finish()
+                        self.report(file_import, final=True)
+        finally:
+            for file_import in imports:
+                file_import.close()
+
+    def save_chunk(
+        self,
+        file_import: 'FileImport',
+        chunk: List[Any],
+        batch_size: int
+    ) -> None:
+        """
+        Сохраняет порцию экземпляров в отдельной транзакции.
+        """
+        with transaction.atomic(), keep_csv_dates(
+            file_import.model,
+            header_fields(file_import.header, file_import.replace)
+        ):
+            if file_import.upsert:
+                self.upsert_chunk(file_import, chunk, batch_size)
+            else:
+                file_import.model.objects.bulk_create(
+                    chunk,
+                    batch_size=batch_size,
                     ignore_conflicts=True
                 )
+        file_import.rows += len(chunk)
+        now = time.monotonic()
+        if now - file_import.reported >= PROGRESS_INTERVAL:
+            file_import.reported = now
+            self.report(file_import)
 
-    def retrieve_model_instance(
+    def upsert_chunk(
         self,
-        row: Dict[str, Optional[str]],
+        file_import: 'FileImport',
+        chunk: List[Tuple[str, str, Any]],
+        batch_size: int
+    ) -> None:
+        """
+        Сравнивает контрольные суммы строк с сохранёнными при прошлом
+        импорте и записывает только новые и изменённые строки.
+        """
+        name: str = file_import.name
+        known: Dict[str, str] = {}
+        for keys in split(
+            [key for key, _, _ in chunk], connection_max_params() - 1
+        ):
+            known.update(ImportRowState.objects.filter(
+                file=name, key__in=keys
+            ).values_list('key', 'checksum'))
+        changed = [
+            (key, checksum, instance) for key, checksum, instance in chunk
+            if known.get(key) != checksum
+        ]
+        if not changed:
+            return
+        file_import.changed += len(changed)
+        upsert_instances(
+            file_import.model,
+            [instance for _, _, instance in changed],
+            batch_size,
+            header_fields(file_import.header, file_import.replace)
+        )
+        for keys in split(
+            [key for key, _, _ in changed if key in known],
+            connection_max_params() - 1
+        ):
+            ImportRowState.objects.filter(file=name, key__in=keys).delete()
+        ImportRowState.objects.bulk_create(
+            [
+                ImportRowState(file=name, key=key, checksum=checksum)
+                for key, checksum, _ in changed
+            ],
+            batch_size=batch_size
+        )
+
+    def report(self, file_import: 'FileImport', final: bool = False) -> None:
+        """
+        Выводит число загруженных строк, скорость и долю прочитанного файла.
+        """
+        elapsed = time.monotonic() - file_import.started
+        rows = file_import.rows
+        changed = (
+            f'изменено {file_import.changed}, ' if file_import.upsert else ''
+        )
+        self.stdout.write(
+            f'{file_import.name}: {rows} строк, {changed}'
+            f'{rows / elapsed if elapsed else rows:.0f} строк/с, '
+            f'{1 if final else file_import.progress:.0%}'
+        )
+
+
+def setup_worker() -> None:
+    """
+    Инициализирует django в процессе пула, если он не унаследован
+    от родителя (запуск через spawn).
+    """
+    if not apps.ready:
+        django.setup()
+
+
+def convert_rows(
+    model_label: str,
+    replace: Dict[str, Optional[str]],
+    header: List[str],
+    rows: Iterable[List[str]],
+    with_checksums: bool = False
+) -> Tuple[List[str], List[Tuple[Any, ...]], Optional[List[str]]]:
+    """
+    Приводит строки csv к значениям полей модели: имена столбцов
+    заменяются по replace, пустые значения nullable-полей (так
+    export_csv выгружает NULL) становятся None. Возвращает имена
+    полей, кортежи значений и, с with_checksums, контрольные суммы
+    строк для режима upsert. Результат — простые кортежи: их дешевле
+    передавать из пула, чем экземпляры моделей.
+    """
+    columns = header_fields(header, replace)
+    nullable = set(nullable_fields(apps.get_model(model_label)))
+    null_positions = [
+        position for position, column in enumerate(columns)
+        if column in nullable
+    ]
+    values: List[Tuple[Any, ...]] = []
+    checksums: Optional[List[str]] = [] if with_checksums else None
+    for row in rows:
+        if not row:
+            continue
+        if with_checksums:
+            checksums.append(
+                hashlib.md5('\x1f'.join(row).encode('utf8')).hexdigest()
+            )
+        for position in null_positions:
+            if row[position] == '':
+                row[position] = None
+        values.append(tuple(row))
+    return columns, values, checksums
+
+
+def parse_range(
+    path: str,
+    start: int,
+    end: int,
+    model_label: str,
+    replace: Dict[str, Optional[str]],
+    header: List[str],
+    with_checksums: bool = False
+) -> Tuple[List[str], List[Tuple[Any, ...]], Optional[List[str]]]:
+    """
+    Читает, декодирует и разбирает участок [start, end) несжатого
+    csv-файла; выполняется в пуле процессов. Участок начинается
+    с начала строки (см. csv_ranges).
+    """
+    with open(path, mode='rb') as file_handle:
+        file_handle.seek(start)
+        text = file_handle.read(end - start).decode('utf8')
+    return convert_rows(
+        model_label, replace, header,
+        csv.reader(io.StringIO(text, newline='')), with_checksums
+    )
+
+
+def csv_ranges(
+    path: Path,
+    start: int,
+    size: int = RANGE_BYTES
+) -> Iterator[Tuple[int, int]]:
+    """
+    Делит файл с позиции start на участки примерно по size байт.
+    Граница — перевод строки вне кавычек: чётность числа кавычек
+    от start показывает, не идёт ли перевод строки внутри поля
+    (в отзывах и комментариях они многострочные). Кавычки
+    считаются bytes.count, без разбора csv.
+    """
+    with open(path, mode='rb') as file_handle:
+        file_handle.seek(start)
+        begin = position = start
+        quotes = 0
+        for block in iter(lambda: file_handle.read(READ_BLOCK), b''):
+            offset = 0
+            while True:
+                newline = block.find(
+                    b'\n', max(begin + size - position, offset)
+                )
+                if newline == -1:
+                    break
+                quotes += block.count(b'"', offset, newline)
+                offset = newline + 1
+                if quotes % 2 == 0:
+                    yield begin, position + offset
+                    begin = position + offset
+            quotes += block.count(b'"', offset)
+            position += len(block)
+        if begin < position:
+            yield begin, position
+
+
+def build_instances(
+    model: Any,
+    columns: List[str],
+    values: List[Tuple[Any, ...]],
+    checksums: Optional[List[str]]
+) -> List[Any]:
+    """
+    Экземпляры модели из результата convert_rows; выполняется в
+    процессе, который пишет в БД. С контрольными суммами возвращает
+    кортежи (id строки, контрольная сумма, экземпляр) для upsert.
+    """
+    instances = [model(**dict(zip(columns, value))) for value in values]
+    if checksums is None:
+        return instances
+    return [
+        (instance.pk, checksum, instance)
+        for checksum, instance in zip(checksums, instances)
+    ]
+
+
+def header_fields(
+    header: List[str],
+    replace: Dict[str, Optional[str]]
+) -> List[str]:
+    """
+    Поля модели из заголовка csv с учётом замены имён replace.
+    """
+    return [replace.get(column, column) for column in header]
+
+
+def upsert_instances(
+    model: Any,
+    instances: List[Any],
+    batch_size: int,
+    columns: List[str]
+) -> None:
+    """
+    Аналог bulk_create(update_conflicts=True), которого нет в Django 3.2:
+    существующие по pk строки обновляются через bulk_update, остальные
+    добавляются. Обновляются только поля из columns — столбцы csv:
+    остальные поля строки сохраняют значения из БД.
+    """
+    pk_field = model._meta.pk
+    for instance in instances:
+        instance.pk = pk_field.to_python(instance.pk)
+    existing: set = set()
+    for pks in split(
+        [instance.pk for instance in instances], connection_max_params()
+    ):
+        existing.update(
+            model.objects.filter(pk__in=pks).values_list('pk', flat=True)
+        )
+    fields: List[str] = [
+        field.name for field in map(model._meta.get_field, columns)
+        if not field.primary_key
+    ]
+    to_update = [instance for instance in instances if instance.pk in existing]
+    if to_update and fields:
+        model.objects.bulk_update(to_update, fields, batch_size=batch_size)
+    model.objects.bulk_create(
+        [instance for instance in instances if instance.pk not in existing],
+        batch_size=batch_size
+    )
+
+
+@contextmanager
+def keep_csv_dates(model: Any, columns: List[str]) -> Iterator[None]:
+    """
+    Отключает auto_now_add у полей из столбцов csv (pub_date отзывов
+    и комментариев), чтобы bulk_create сохранил даты из файла, а не
+    время импорта. Поля без столбца в csv заполняются как обычно.
+    """
+    fields = [
+        field for field in map(model._meta.get_field, columns)
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def connection_max_params() -> int:
+    """
+    Наибольшее число параметров в одном запросе для текущей БД.
+    """
+    return connections['default'].features.max_query_params or 1000
+
+
+def split(items: List[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Делит список на части не длиннее size.
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+@lru_cache(maxsize=None)
+def nullable_fields(model: Any) -> Tuple[str, ...]:
+    return tuple(
+        field.attname for field in model._meta.concrete_fields if field.null
+    )
+
+
+def resolve_csv_path(directory: Path, name: str) -> Path:
+    """
+    Путь к файлу name или к его сжатой копии name.gz.
+    """
+    path = Path(directory, name)
+    compressed = Path(directory, f'{name}.gz')
+    if not path.exists() and compressed.exists():
+        return compressed
+    return path
+
+
+class FileImport:
+    """
+    Состояние загрузки одного файла: открытый reader, заголовок и счётчики.
+    С parallel несжатый файл делится на участки (csv_ranges), которые
+    читают и разбирают процессы пула; иначе строки читаются здесь.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        name: str,
         model: Any,
-        replace: Dict[str, Optional[str]]
-    ) -> Any:
+        replace: Dict[str, Optional[str]],
+        upsert: bool = False,
+        parallel: bool = False
+    ) -> None:
+        self.name = name
+        self.path = resolve_csv_path(directory, name)
+        self.model = model
+        self.replace = replace
+        self.upsert = upsert
+        self.checksum: str = file_checksum(self.path) if upsert else ''
+        self.changed: int = 0
+        self.total_bytes: int = self.path.stat().st_size
+        self.file_handle = open(self.path, mode='rb')
+        stream = self.file_handle
+        if self.path.suffix == '.gz':
+            stream = gzip.GzipFile(fileobj=self.file_handle)
+        self.reader = csv.reader(
+            io.TextIOWrapper(stream, encoding='utf8', newline='')
+        )
+        self.header: List[str] = next(self.reader, [])
+        self.ranges: Optional[Iterator[Tuple[int, int]]] = None
+        self.position: int = 0
+        if parallel and self.path.suffix != '.gz':
+            self.file_handle.seek(0)
+            self.header = next(
+                csv.reader([self.file_handle.readline().decode('utf8')]), []
+            )
+            self.ranges = csv_ranges(
+                self.path, self.file_handle.tell(), RANGE_BYTES
+            )
+        self.rows: int = 0
+        self.in_flight: int = 0
+        self.started: float = time.monotonic()
+        self.reported: float = self.started
+
+    @property
+    def progress(self) -> float:
+        if self.closed or not self.total_bytes:
+            return 1
+        if self.ranges is not None:
+            return self.position / self.total_bytes
+        return self.file_handle.tell() / self.total_bytes
+
+    @property
+    def closed(self) -> bool:
+        return self.file_handle.closed
+
+    def close(self) -> None:
+        self.file_handle.close()
+
+    def next_task(self, batch_size: int) -> Optional[Tuple[Any, ...]]:
+        """
+        Следующая задача для пула: участок файла для parse_range или
+        порция из batch_size строк для convert_rows; None в конце файла.
+        """
+        label = self.model._meta.label
+        if self.ranges is not None:
+            start, end = next(self.ranges, (None, None))
+            if start is None:
+                return None
+            self.position = end
+            return (
+                parse_range, str(self.path), start, end, label,
+                self.replace, self.header, self.upsert
+            )
+        rows = list(islice(self.reader, batch_size))
+        if not rows:
+            return None
+        return (
+            convert_rows, label, self.replace, self.header, rows,
+            self.upsert
+        )
+
+    def unchanged(self) -> bool:
         """
-        Извлекает экземпляр модели, используя заданные данные строки,
-        и обрабатывает замену имен полей.
+        Файл не менялся с последнего успешного импорта в режиме upsert.
         """
-        instance_kwargs: Dict[str, Optional[str]] = {**row}
-        if replace:
-            for old, new in replace.items():
-                instance_kwargs[new] = instance_kwargs.pop(old)
-        return model(**instance_kwargs)
+        return ImportFileState.objects.filter(
+            file=self.name, checksum=self.checksum
+        ).exists()
+
+    def finish(self) -> None:
+        """
+        Запоминает контрольную сумму полностью загруженного файла.
+        """
+        if self.upsert:
+            ImportFileState.objects.update_or_create(
+                file=self.name, defaults={'checksum': self.checksum}
+            )
+
+
+def file_checksum(path: Path) -> str:
+    """
+    sha256 содержимого файла, читаемого блоками.
+    """
+    digest = hashlib.sha256()
+    with open(path, mode='rb') as file_handle:
+        for block in iter(lambda: file_handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class InlineExecutor:
+    """
+    Исполнитель с интерфейсом пула, выполняющий задачи сразу
+    в текущем процессе.
+    """
+
+    def __enter__(self) -> 'InlineExecutor':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def submit(self, fn: Any, *args: Any) -> Future:
+        future: Future = Future()
+        future.set_result(fn(*args))
+        return future
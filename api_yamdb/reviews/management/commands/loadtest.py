@@ -0,0 +1,297 @@
+from typing import Any, Callable, Dict, List, Tuple, Union
+import asyncio
+import io
+import statistics
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from api import metrics
+from api.asgi import AsyncReadASGIHandler, shutdown_executors
+from reviews.models import Review, Title
+from .benchmark_api import load_scale
+from .generate_dataset import SCALES
+
+SERVERS: Tuple[str, ...] = ('wsgi', 'asgi')
+DEFAULT_CONCURRENCY: int = 64
+DEFAULT_REQUESTS: int = 2000
+HOST: str = 'testserver'
+
+Target = Tuple[str, str]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI- и ASGI-обработчиков '
+        'на маршрутах чтения при большом числе одновременных клиентов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            default='tiny',
+            choices=tuple(SCALES),
+            help='Размер синтетического набора данных.'
+        )
+        parser.add_argument(
+            '--servers',
+            default=','.join(SERVERS),
+            help='Обработчики через запятую: wsgi, asgi.'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=DEFAULT_CONCURRENCY,
+            help='Число одновременных клиентов.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=DEFAULT_REQUESTS,
+            help='Сколько запросов выполнить на каждом обработчике.'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help=(
+                'Потоков WSGI-воркера (как gunicorn --threads); по '
+                'умолчанию ASYNC_READ_WORKERS, чтобы оба обработчика '
+                'имели одинаковое число потоков для БД.'
+            )
+        )
+
+    def handle(self, *args: Union[Tuple, Any], **kwargs: Any) -> None:
+        """
+        Обработчики вызываются в процессе команды напрямую по
+        протоколам WSGI и ASGI, без сетевого сервера: разница в
+        результатах — это разница в том, как Django выполняет
+        представления. БД — отдельная тестовая.
+        """
+        servers: List[str] = kwargs['servers'].split(',')
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные обработчики: {", ".join(unknown)}'
+            )
+        if kwargs['concurrency'] < 1 or kwargs['requests'] < 1:
+            raise CommandError(
+                '--concurrency и --requests должны быть больше нуля.'
+            )
+        threads: int = kwargs['threads'] or settings.ASYNC_READ_WORKERS
+
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            load_scale(kwargs['scale'])
+            targets = read_targets()
+            self.stdout.write(
+                f'== {kwargs["scale"]}: {Review.objects.count()} отзывов, '
+                f'клиентов {kwargs["concurrency"]}, '
+                f'запросов {kwargs["requests"]}'
+            )
+            # Медленные запросы при перегрузке — ожидаемое состояние,
+            # а не повод писать SQL в лог.
+            with metrics.temporary_dir(), override_settings(
+                SLOW_REQUEST_SAMPLE_RATE=0, ASYNC_READ_WORKERS=threads
+            ):
+                for server in servers:
+                    run = run_wsgi if server == 'wsgi' else run_asgi
+                    started = time.perf_counter()
+                    results = run(
+                        targets, kwargs['concurrency'], kwargs['requests'],
+                        threads
+                    )
+                    self.report(
+                        server, results, time.perf_counter() - started
+                    )
+        finally:
+            shutdown_executors()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def report(
+        self,
+        server: str,
+        results: List[Tuple[int, float]],
+        elapsed: float
+    ) -> None:
+        timings = sorted(latency * 1000 for _, latency in results)
+        errors = sum(1 for status, _ in results if status != 200)
+        self.stdout.write(
+            f'{server:<5} {len(results) / elapsed:8.1f} запросов/с  '
+            f'p50 {statistics.median(timings):8.2f} мс  '
+            f'p95 {percentile(timings, 0.95):8.2f} мс  '
+            f'p99 {percentile(timings, 0.99):8.2f} мс  '
+            f'ошибок {errors}'
+        )
+
+
+def percentile(timings: List[float], share: float) -> float:
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def read_targets() -> List[Target]:
+    """
+    Маршруты чтения, которые api.asgi выполняет в пуле потоков:
+    списки и детальные страницы каталога, отзывов и комментариев.
+    """
+    title = Title.objects.annotate(
+        reviews_count=Count('reviews')
+    ).order_by('-reviews_count').first()
+    review = Review.objects.annotate(
+        comments_count=Count('comments')
+    ).order_by('-comments_count').first()
+    reviews_url = f'/api/v1/titles/{review.title_id}/reviews/'
+    return [
+        ('/api/v1/categories/', ''),
+        ('/api/v1/genres/', ''),
+        ('/api/v1/titles/', ''),
+        ('/api/v1/titles/', 'limit=100'),
+        (f'/api/v1/titles/{title.id}/', ''),
+        (f'/api/v1/titles/{title.id}/reviews/', ''),
+        (f'{reviews_url}{review.id}/', ''),
+        (f'{reviews_url}{review.id}/comments/', ''),
+    ]
+
+
+def run_clients(
+    concurrency: int,
+    total: int,
+    request: Callable[[int], int]
+) -> List[Tuple[int, float]]:
+    """
+    concurrency потоков-клиентов по очереди выполняют total запросов;
+    request(номер) возвращает статус ответа.
+    """
+    results: List[Tuple[int, float]] = []
+    numbers = iter(range(total))
+    lock = threading.Lock()
+
+    def client() -> None:
+        while True:
+            with lock:
+                number = next(numbers, None)
+            if number is None:
+                return
+            started = time.perf_counter()
+            status = request(number)
+            with lock:
+                results.append((status, time.perf_counter() - started))
+
+    clients = [
+        threading.Thread(target=client) for _ in range(concurrency)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return results
+
+
+def run_wsgi(
+    targets: List[Target],
+    concurrency: int,
+    total: int,
+    threads: int
+) -> List[Tuple[int, float]]:
+    """
+    WSGI-воркер с threads потоками: клиенты сверх этого числа ждут
+    свободный поток, как в очереди gunicorn --threads.
+    """
+    handler = WSGIHandler()
+    workers = threading.BoundedSemaphore(threads)
+
+    def request(number: int) -> int:
+        path, query = targets[number % len(targets)]
+        statuses: List[str] = []
+        environ: Dict[str, Any] = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': HOST,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': HOST,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        with workers:
+            response = handler(
+                environ, lambda status, headers: statuses.append(status)
+            )
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+        return int(statuses[0].split()[0])
+
+    return run_clients(concurrency, total, request)
+
+
+def run_asgi(
+    targets: List[Target],
+    concurrency: int,
+    total: int,
+    threads: int
+) -> List[Tuple[int, float]]:
+    """
+    ASGI-воркер: один цикл событий, чтение — в пуле api.asgi
+    из threads потоков.
+    """
+    handler = AsyncReadASGIHandler()
+    results: List[Tuple[int, float]] = []
+    numbers = iter(range(total))
+
+    async def request(number: int) -> int:
+        path, query = targets[number % len(targets)]
+        messages: List[Dict[str, Any]] = []
+        scope: Dict[str, Any] = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'headers': [(b'host', HOST.encode())],
+            'server': (HOST, 80),
+            'client': ('127.0.0.1', 0),
+        }
+
+        async def receive() -> Dict[str, Any]:
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message: Dict[str, Any]) -> None:
+            messages.append(message)
+
+        await handler(scope, receive, send)
+        return messages[0]['status']
+
+    async def client() -> None:
+        for number in numbers:
+            started = time.perf_counter()
+            status = await request(number)
+            results.append((status, time.perf_counter() - started))
+
+    async def main() -> None:
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    asyncio.run(main())
+    return results
@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_alter_title_year'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportFileState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.CharField(max_length=150, unique=True, verbose_name='Файл')),
+                ('checksum', models.CharField(max_length=64, verbose_name='Контрольная сумма файла')),
+                ('imported_at', models.DateTimeField(auto_now=True, verbose_name='Дата загрузки')),
+            ],
+            options={
+                'verbose_name': 'Состояние импорта файла',
+                'verbose_name_plural': 'Состояния импорта файлов',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportRowState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.CharField(max_length=150, verbose_name='Файл')),
+                ('key', models.CharField(max_length=150, verbose_name='Ключ строки')),
+                ('checksum', models.CharField(max_length=32, verbose_name='Контрольная сумма строки')),
+            ],
+            options={
+                'verbose_name': 'Состояние импорта строки',
+                'verbose_name_plural': 'Состояния импорта строк',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importrowstate',
+            constraint=models.UniqueConstraint(fields=('file', 'key'), name='unique_file_key'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-19 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_import_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title_id', models.PositiveBigIntegerField(db_index=True, verbose_name='Произведение')),
+                ('type', models.CharField(max_length=32, verbose_name='Тип события')),
+                ('data', models.TextField(verbose_name='Данные события в JSON')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата события')),
+            ],
+            options={
+                'verbose_name': 'Событие произведения',
+                'verbose_name_plural': 'События произведений',
+                'ordering': ('id',),
+            },
+        ),
+    ]
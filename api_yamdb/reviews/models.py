@@ -213,3 +213,55 @@ class Comment(models.Model):
             f'Комментарий {self.author} к '
             f'отзыву {self.review}'[:TITLE_LIMIT]
         )
+
+
+class ImportFileState(models.Model):
+    file = models.CharField('Файл', max_length=MAX_LENGTH, unique=True)
+    checksum = models.CharField('Контрольная сумма файла', max_length=64)
+    imported_at = models.DateTimeField('Дата загрузки', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Состояние импорта файла'
+        verbose_name_plural = 'Состояния импорта файлов'
+
+    def __str__(self):
+        return self.file[:TITLE_LIMIT]
+
+
+class ImportRowState(models.Model):
+    file = models.CharField('Файл', max_length=MAX_LENGTH)
+    key = models.CharField('Ключ строки', max_length=MAX_LENGTH)
+    checksum = models.CharField('Контрольная сумма строки', max_length=32)
+
+    class Meta:
+        verbose_name = 'Состояние импорта строки'
+        verbose_name_plural = 'Состояния импорта строк'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('file', 'key',),
+                name='unique_file_key'
+            )]
+
+    def __str__(self):
+        return f'{self.file}:{self.key}'[:TITLE_LIMIT]
+
+
+class TitleEvent(models.Model):
+    """
+    Журнал событий отзывов и комментариев: через него api.events
+    рассылает SSE между воркерами (EVENTS_BACKEND = 'database').
+    """
+    title_id = models.PositiveBigIntegerField('Произведение', db_index=True)
+    type = models.CharField('Тип события', max_length=32)
+    data = models.TextField('Данные события в JSON')
+    created = models.DateTimeField(
+        'Дата события', auto_now_add=True, db_index=True
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Событие произведения'
+        verbose_name_plural = 'События произведений'
+
+    def __str__(self):
+        return f'{self.type} #{self.id}'[:TITLE_LIMIT]
@@ -2,11 +2,13 @@
 import re
 from django.core.exceptions import ValidationError
 
+RESERVED_USERNAMES = ('me', 'bulk')
+
 
 def validate_username(value) -> None:
-    if value == 'me':
+    if value in RESERVED_USERNAMES:
         raise ValidationError(
-            ('Имя пользователя не может быть <me>.'),
+            (f'Имя пользователя не может быть <{value}>.'),
             params={'value': value},
         )
     if re.search(r'^[a-zA-Z][a-zA-Z0-9-_\.]{1,20}$', value) is None:
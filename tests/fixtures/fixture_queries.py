@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def query_budget(settings):
+    """
+    Во всех тестах превышение query_budget представления и N+1
+    приводят к исключению QueryBudgetExceeded.
+    """
+    settings.QUERY_BUDGET_RAISE = True
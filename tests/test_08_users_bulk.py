@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08UsersBulkAPI:
+
+    BULK_URL = '/api/v1/users/bulk/'
+
+    def test_01_bulk_not_admin(self, user_client, moderator_client, user):
+        data = {'usernames': [user.username], 'role': 'admin'}
+        for client in (user_client, moderator_client):
+            response = client.patch(self.BULK_URL, data=data, format='json')
+            assert response.status_code == HTTPStatus.FORBIDDEN, (
+                f'Проверьте, что PATCH-запрос к `{self.BULK_URL}` от '
+                'пользователя без прав администратора возвращает ответ со '
+                'статусом 403.'
+            )
+        user.refresh_from_db()
+        assert user.role == 'user'
+
+    def test_02_bulk_update(self, admin_client, user, moderator,
+                            django_user_model):
+        data = {
+            'usernames': [user.username, moderator.username, 'missing'],
+            'role': 'moderator',
+            'is_active': False,
+        }
+        response = admin_client.patch(self.BULK_URL, data=data, format='json')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что PATCH-запрос администратора к `{self.BULK_URL}` '
+            'с корректными данными возвращает ответ со статусом 200.'
+        )
+        assert response.json()['results'] == [
+            {'username': user.username, 'status': 'updated'},
+            {'username': moderator.username, 'status': 'updated'},
+            {'username': 'missing', 'status': 'not_found'},
+        ], (
+            f'Проверьте, что ответ на PATCH-запрос к `{self.BULK_URL}` '
+            'содержит результат для каждого переданного username.'
+        )
+        for obj in (user, moderator):
+            obj.refresh_from_db()
+            assert obj.role == 'moderator' and not obj.is_active, (
+                f'Проверьте, что PATCH-запрос к `{self.BULK_URL}` изменяет '
+                'поля всех переданных пользователей.'
+            )
+
+    def test_03_bulk_validation(self, admin_client, user):
+        invalid_data = (
+            {'usernames': [user.username], 'role': 'superstar'},
+            {'usernames': [user.username], 'email': 'same@yamdb.fake'},
+            {'usernames': [user.username]},
+            {'usernames': [], 'role': 'user'},
+        )
+        for data in invalid_data:
+            response = admin_client.patch(
+                self.BULK_URL, data=data, format='json'
+            )
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что PATCH-запрос к `{self.BULK_URL}` с '
+                f'некорректными данными {data} возвращает ответ со '
+                'статусом 400.'
+            )
+        user.refresh_from_db()
+        assert user.role == 'user' and user.email == 'testuser@yamdb.fake'
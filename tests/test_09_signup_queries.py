@@ -0,0 +1,64 @@
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09SignupQueries:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    VALID_DATA = {
+        'email': 'valid@yamdb.fake',
+        'username': 'valid_username'
+    }
+
+    def test_01_new_user_signup_queries(self, client,
+                                        django_assert_num_queries):
+        with django_assert_num_queries(2):
+            response = client.post(self.URL_SIGNUP, data=self.VALID_DATA)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что POST-запрос к `{self.URL_SIGNUP}` с корректными '
+            'данными возвращает ответ со статусом 200.'
+        )
+
+    def test_02_repeat_signup_queries(self, client, django_user_model,
+                                      django_assert_num_queries):
+        client.post(self.URL_SIGNUP, data=self.VALID_DATA)
+        outbox_before_count = len(mail.outbox)
+
+        with django_assert_num_queries(2):
+            response = client.post(self.URL_SIGNUP, data=self.VALID_DATA)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что повторный POST-запрос к `{self.URL_SIGNUP}` с '
+            'данными зарегистрированного пользователя возвращает ответ со '
+            'статусом 200.'
+        )
+        assert len(mail.outbox) == outbox_before_count + 1
+        user = django_user_model.objects.get(
+            username=self.VALID_DATA['username']
+        )
+        assert user.confirmation_code in mail.outbox[-1].body, (
+            'Проверьте, что в письме отправляется код подтверждения, '
+            'сохранённый у пользователя.'
+        )
+        assert django_user_model.objects.count() == 1
+
+    def test_03_conflicting_signup_queries(self, client, django_user_model,
+                                           django_assert_num_queries):
+        client.post(self.URL_SIGNUP, data=self.VALID_DATA)
+        conflicts = (
+            ({'email': 'other@yamdb.fake',
+              'username': self.VALID_DATA['username']}, 'username'),
+            ({'email': self.VALID_DATA['email'],
+              'username': 'other_username'}, 'email'),
+        )
+        for data, field in conflicts:
+            with django_assert_num_queries(1):
+                response = client.post(self.URL_SIGNUP, data=data)
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+            assert field in response.json(), (
+                f'Проверьте, что при конфликте по полю `{field}` ответ '
+                f'на POST-запрос к `{self.URL_SIGNUP}` содержит это поле.'
+            )
+        assert django_user_model.objects.count() == 1
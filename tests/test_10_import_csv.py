@@ -0,0 +1,279 @@
+import csv
+import os
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from reviews.management.commands import import_csv
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+from tests.conftest import MANAGE_PATH
+
+CSV_DIR = Path(MANAGE_PATH, 'static', 'data')
+
+
+def count_rows(file):
+    with open(Path(CSV_DIR, file), encoding='utf8') as file_handle:
+        return sum(1 for _ in csv.DictReader(file_handle))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10ImportCSV:
+
+    def check_counts(self):
+        expected = (
+            (Category, 'category.csv'),
+            (Genre, 'genre.csv'),
+            (User, 'users.csv'),
+            (Title, 'titles.csv'),
+            (Title.genre.through, 'genre_title.csv'),
+            (Review, 'review.csv'),
+            (Comment, 'comments.csv'),
+        )
+        for model, file in expected:
+            assert model.objects.count() == count_rows(file), (
+                f'Проверьте, что команда `import_csv` загружает все строки '
+                f'файла `{file}`.'
+            )
+
+    def test_01_import_in_chunks(self):
+        out = StringIO()
+        call_command(
+            'import_csv', path=CSV_DIR, batch_size=7, workers=1, stdout=out
+        )
+        self.check_counts()
+        assert 'строк/с' in out.getvalue(), (
+            'Проверьте, что команда `import_csv` выводит скорость загрузки.'
+        )
+
+    def test_02_repeat_import_is_idempotent(self):
+        call_command('import_csv', path=CSV_DIR, stdout=StringIO())
+        call_command('import_csv', path=CSV_DIR, stdout=StringIO())
+        self.check_counts()
+
+    def test_03_import_in_process_pool(self):
+        call_command(
+            'import_csv', path=CSV_DIR, batch_size=5, workers=2,
+            stdout=StringIO()
+        )
+        self.check_counts()
+
+    def test_04_missing_dir(self, tmp_path):
+        with pytest.raises(OSError):
+            call_command(
+                'import_csv', path=os.fspath(tmp_path), stdout=StringIO()
+            )
+
+    def test_05_upsert_skips_unchanged(self, tmp_path):
+        for file in os.listdir(CSV_DIR):
+            (tmp_path / file).write_bytes((CSV_DIR / file).read_bytes())
+        call_command(
+            'import_csv', path=os.fspath(tmp_path), mode='upsert',
+            workers=1, stdout=StringIO()
+        )
+        self.check_counts()
+
+        out = StringIO()
+        call_command(
+            'import_csv', path=os.fspath(tmp_path), mode='upsert',
+            workers=1, stdout=out
+        )
+        assert out.getvalue().count('без изменений') == 7, (
+            'Проверьте, что в режиме `upsert` неизменённые файлы пропускаются.'
+        )
+
+        genres = (tmp_path / 'genre.csv').read_text(encoding='utf8')
+        (tmp_path / 'genre.csv').write_text(
+            genres.replace(
+                '1,Драма,drama', '1,Драма и мелодрама,drama'
+            ).rstrip('\n') + '\n100,Новый жанр,new-genre\n',
+            encoding='utf8'
+        )
+        out = StringIO()
+        call_command(
+            'import_csv', path=os.fspath(tmp_path), mode='upsert',
+            workers=2, stdout=out
+        )
+        assert 'genre.csv: 16 строк, изменено 2' in out.getvalue(), (
+            'Проверьте, что в режиме `upsert` записываются только '
+            'изменённые и новые строки.'
+        )
+        assert Genre.objects.get(slug='drama').name == 'Драма и мелодрама'
+        assert Genre.objects.filter(slug='new-genre').exists()
+        assert out.getvalue().count('без изменений') == 6
+
+    def test_06_fast_mode_restores_indexes(self):
+        def indexes():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT name FROM sqlite_master WHERE type = \'index\''
+                )
+                return set(cursor.fetchall())
+
+        before = indexes()
+        call_command(
+            'import_csv', path=CSV_DIR, fast=True, workers=1,
+            stdout=StringIO()
+        )
+        self.check_counts()
+        assert indexes() == before, (
+            'Проверьте, что после загрузки с `--fast` все индексы '
+            'пересозданы.'
+        )
+
+    def test_07_export_import_roundtrip(self, tmp_path):
+        call_command(
+            'import_csv', path=CSV_DIR, workers=1, stdout=StringIO()
+        )
+
+        def pub_dates():
+            return [
+                list(model.objects.order_by('pk').values_list(
+                    'pk', 'pub_date'
+                )) for model in (Review, Comment)
+            ]
+
+        dates = pub_dates()
+        for compress in (False, True):
+            export_dir = tmp_path / str(compress)
+            call_command(
+                'export_csv', path=os.fspath(export_dir), gzip=compress,
+                stdout=StringIO()
+            )
+            with open(CSV_DIR / 'review.csv', encoding='utf8') as source:
+                header = next(csv.reader(source))
+            if not compress:
+                with open(export_dir / 'review.csv', encoding='utf8') as dump:
+                    assert next(csv.reader(dump)) == header, (
+                        'Проверьте, что `export_csv` записывает те же '
+                        'заголовки, что и в static/data.'
+                    )
+            for model in (Comment, Title.genre.through, Review, Title, User,
+                          Genre, Category):
+                model.objects.all().delete()
+            call_command(
+                'import_csv', path=os.fspath(export_dir), workers=1,
+                stdout=StringIO()
+            )
+            self.check_counts()
+            assert pub_dates() == dates, (
+                'Проверьте, что `import_csv` сохраняет `pub_date` из файла, '
+                'а не время загрузки.'
+            )
+
+    def test_08_export_since(self, tmp_path):
+        call_command(
+            'import_csv', path=CSV_DIR, workers=1, stdout=StringIO()
+        )
+        call_command(
+            'export_csv', path=os.fspath(tmp_path), since='2100-01-01',
+            stdout=StringIO()
+        )
+        with open(tmp_path / 'review.csv', encoding='utf8') as dump:
+            assert len(list(csv.reader(dump))) == 1
+        with open(tmp_path / 'genre.csv', encoding='utf8') as dump:
+            assert len(list(csv.reader(dump))) == count_rows('genre.csv') + 1
+
+    def test_09_generate_dataset(self, tmp_path):
+        for directory in ('first', 'second'):
+            call_command(
+                'generate_dataset', path=os.fspath(tmp_path / directory),
+                scale='tiny', seed=7, stdout=StringIO()
+            )
+        for file in os.listdir(tmp_path / 'first'):
+            assert (
+                (tmp_path / 'first' / file).read_bytes()
+                == (tmp_path / 'second' / file).read_bytes()
+            ), (
+                'Проверьте, что `generate_dataset` с одинаковым `--seed` '
+                'создаёт одинаковые файлы.'
+            )
+        call_command(
+            'import_csv', path=os.fspath(tmp_path / 'first'), workers=1,
+            stdout=StringIO()
+        )
+        assert User.objects.count() == 200
+        assert Title.objects.count() == 50
+        assert Review.objects.count() == 1000, (
+            'Проверьте, что все отзывы `generate_dataset` загружаются: пара '
+            'произведение-автор должна быть уникальной.'
+        )
+        assert Comment.objects.count() == 300
+
+    def test_10_benchmark_compare(self):
+        from reviews.management.commands.benchmark_api import compare
+
+        def report(p95, queries):
+            return {'results': {'tiny': {'titles-list': {
+                'p95_ms': p95, 'queries': queries,
+            }}}}
+
+        assert compare(report(10, 3), report(11.5, 3), 0.2) == []
+        assert len(compare(report(10, 3), report(13, 3), 0.2)) == 1, (
+            'Проверьте, что `benchmark_api` считает регрессией рост p95 '
+            'больше допустимого.'
+        )
+        assert len(compare(report(0.5, 3), report(1.2, 3), 0.2)) == 0
+        assert len(compare(report(10, 3), report(10, 4), 0.2)) == 1, (
+            'Проверьте, что `benchmark_api` считает регрессией рост числа '
+            'запросов.'
+        )
+
+    def test_11_upsert_keeps_missing_columns(self, tmp_path):
+        for file in os.listdir(CSV_DIR):
+            (tmp_path / file).write_bytes((CSV_DIR / file).read_bytes())
+        call_command(
+            'import_csv', path=os.fspath(tmp_path), mode='upsert',
+            workers=1, stdout=StringIO()
+        )
+        user = User.objects.get(pk=100)
+        user.set_password('password')
+        user.is_superuser = True
+        user.confirmation_code = 'code'
+        user.save()
+        Title.objects.filter(pk=1).update(description='Описание')
+
+        for file, old, new in (
+            ('users.csv', 'bingobongo@yamdb.fake,user,,',
+             'bingobongo@yamdb.fake,user,Биография,'),
+            ('titles.csv', '1,Побег из Шоушенка,', '1,Побег,'),
+        ):
+            text = (tmp_path / file).read_text(encoding='utf8')
+            (tmp_path / file).write_text(
+                text.replace(old, new), encoding='utf8'
+            )
+        call_command(
+            'import_csv', path=os.fspath(tmp_path), mode='upsert',
+            workers=1, stdout=StringIO()
+        )
+        updated = User.objects.get(pk=100)
+        assert updated.bio == 'Биография'
+        assert (
+            updated.password, updated.is_superuser,
+            updated.confirmation_code, updated.date_joined
+        ) == (
+            user.password, True, 'code', user.date_joined
+        ), (
+            'Проверьте, что в режиме `upsert` поля, которых нет в csv, '
+            'не перезаписываются.'
+        )
+        title = Title.objects.get(pk=1)
+        assert (title.name, title.description) == ('Побег', 'Описание')
+
+    def test_12_import_in_ranges(self, monkeypatch):
+        monkeypatch.setattr(import_csv, 'RANGE_BYTES', 64)
+        call_command(
+            'import_csv', path=CSV_DIR, batch_size=5, workers=2,
+            stdout=StringIO()
+        )
+        self.check_counts()
+        with open(Path(CSV_DIR, 'review.csv'), encoding='utf8') as file:
+            texts = {
+                int(row['id']): row['text'] for row in csv.DictReader(file)
+            }
+        assert dict(Review.objects.values_list('id', 'text')) == texts, (
+            'Проверьте, что участки файла делятся по строкам csv и '
+            'многострочные поля не разрываются.'
+        )
@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import pytest
+from api.middleware import QueryBudgetExceeded, fingerprint
+from api.views import CategoryViewSet
+from reviews.models import Category, Comment, Genre, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11QueryBudget:
+
+    def create_data(self, django_user_model, count=12):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        genres = [
+            Genre.objects.create(name=f'Жанр {number}', slug=f'g{number}')
+            for number in range(3)
+        ]
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@yamdb.fake'
+            ) for number in range(count)
+        ]
+        title = None
+        for number in range(count):
+            title = Title.objects.create(
+                name=f'Произведение {number}', year=2000, category=category
+            )
+            title.genre.set(genres)
+        reviews = [
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=5
+            ) for author in authors
+        ]
+        for author in authors:
+            Comment.objects.create(
+                review=reviews[0], author=author, text='Комментарий'
+            )
+        return title, reviews[0]
+
+    def test_01_lists_have_no_n_plus_one(self, client, django_user_model):
+        title, review = self.create_data(django_user_model)
+        for url in (
+            '/api/v1/titles/',
+            f'/api/v1/titles/{title.id}/reviews/',
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+        ):
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            recorder = response.wsgi_request.query_recorder
+            assert not recorder.duplicates(threshold=2), (
+                f'Проверьте, что GET-запрос к `{url}` не выполняет '
+                'отдельный SQL-запрос для каждого объекта списка.'
+            )
+
+    def test_02_budget_exceeded(self, client, monkeypatch):
+        monkeypatch.setattr(CategoryViewSet, 'query_budget', {'list': 0})
+        with pytest.raises(QueryBudgetExceeded):
+            client.get('/api/v1/categories/')
+
+    def test_03_fingerprint(self):
+        assert fingerprint(
+            'SELECT * FROM t WHERE id = %s LIMIT 21'
+        ) == fingerprint('SELECT  *  FROM t WHERE id = 7 LIMIT 1')
+        assert fingerprint(
+            'SELECT * FROM t WHERE id IN (%s, %s, %s)'
+        ) == fingerprint("SELECT * FROM t WHERE id IN ('a')")
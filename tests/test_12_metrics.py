@@ -0,0 +1,93 @@
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from api import metrics
+from django.core.cache import cache
+from django.core.management import call_command
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12Metrics:
+
+    def test_01_request_metrics(self, client):
+        client.get('/api/v1/categories/')
+        client.post('/api/v1/auth/signup/', data={
+            'username': 'metrics_user', 'email': 'metrics@yamdb.fake'
+        })
+        response = client.get('/metrics')
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/plain')
+        body = response.content.decode()
+        for line in (
+            'yamdb_http_requests_total{view="categories-list",'
+            'method="GET",status="200"} 1',
+            'yamdb_http_request_duration_seconds_count{'
+            'view="categories-list",method="GET"} 1',
+            'yamdb_db_queries_per_request_bucket{view="signup",'
+            'method="POST",le="+Inf"} 1',
+            'yamdb_email_queue_depth 0',
+        ):
+            assert line in body, (
+                f'Проверьте, что `/metrics` содержит строку `{line}`.'
+            )
+
+    def test_02_processes_are_summed(self, client, metrics_dir):
+        client.get('/api/v1/genres/')
+        (metrics_dir / '999999999.json').write_text(json.dumps([
+            [
+                'yamdb_http_requests_total',
+                [['view', 'genres-list'], ['method', 'GET'],
+                 ['status', '200']],
+                4
+            ],
+            ['yamdb_email_queue_depth', [], 3],
+        ]))
+        body = client.get('/metrics').content.decode()
+        assert (
+            'yamdb_http_requests_total{view="genres-list",method="GET",'
+            'status="200"} 5'
+        ) in body, (
+            'Проверьте, что `/metrics` складывает счётчики всех процессов.'
+        )
+        assert 'yamdb_email_queue_depth 3' not in body, (
+            'Проверьте, что gauge завершившихся процессов не учитываются.'
+        )
+        assert not (metrics_dir / '999999999.json').exists(), (
+            'Проверьте, что файлы завершившихся процессов удаляются.'
+        )
+        body = client.get('/metrics').content.decode()
+        assert (
+            'yamdb_http_requests_total{view="genres-list",method="GET",'
+            'status="200"} 5'
+        ) in body, (
+            'Проверьте, что счётчики завершившихся процессов сохраняются '
+            'после удаления их файлов.'
+        )
+
+    def test_03_cache_hits_and_misses(self):
+        cache.get('metrics-key')
+        cache.set('metrics-key', 1)
+        cache.get('metrics-key')
+        cache.get_many(['metrics-key', 'missing-key'])
+        body = metrics.render()
+        assert 'yamdb_cache_requests_total{result="hit"} 2' in body
+        assert 'yamdb_cache_requests_total{result="miss"} 2' in body
+
+    def test_04_allowed_ips(self, client, settings):
+        settings.METRICS_ALLOWED_IPS = ['10.0.0.1']
+        assert client.get('/metrics').status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что `/metrics` закрыт для адресов не из '
+            '`METRICS_ALLOWED_IPS`.'
+        )
+        response = client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        assert response.status_code == HTTPStatus.OK
+
+    def test_05_clear(self, client, metrics_dir):
+        client.get('/api/v1/genres/')
+        (metrics_dir / '999999999.json').write_text('[]')
+        call_command('clear_metrics', stdout=StringIO())
+        assert not list(metrics_dir.iterdir()), (
+            'Проверьте, что `clear_metrics` удаляет файлы метрик.'
+        )
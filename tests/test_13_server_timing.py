@@ -0,0 +1,64 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+from reviews.models import User
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13ServerTiming:
+
+    def test_01_server_timing_header(self, admin_client):
+        response = admin_client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        header = response.get('Server-Timing', '')
+        for name in ('auth', 'db', 'serialize', 'render', 'total'):
+            assert f'{name};dur=' in header, (
+                f'Проверьте, что заголовок `Server-Timing` содержит `{name}`.'
+            )
+
+    def test_02_slow_log_with_query_plan(self, client, settings, caplog):
+        settings.SLOW_REQUEST_THRESHOLD = 0
+        settings.SLOW_REQUEST_SAMPLE_RATE = 1
+        with caplog.at_level(logging.WARNING, logger='api.slow'):
+            client.get('/api/v1/categories/')
+        records = [
+            record for record in caplog.records if record.name == 'api.slow'
+        ]
+        assert len(records) == 1, (
+            'Проверьте, что медленный запрос записывается в лог `api.slow`.'
+        )
+        message = records[0].getMessage()
+        assert 'FROM "reviews_category"' in message
+        assert 'SCAN' in message or 'SEARCH' in message, (
+            'Проверьте, что в лог медленных запросов пишется план запроса.'
+        )
+
+    def test_03_slow_log_sampling(self, client, settings, caplog):
+        settings.SLOW_REQUEST_THRESHOLD = 0
+        settings.SLOW_REQUEST_SAMPLE_RATE = 0
+        with caplog.at_level(logging.WARNING, logger='api.slow'):
+            response = client.get('/api/v1/categories/')
+        assert not [
+            record for record in caplog.records if record.name == 'api.slow'
+        ]
+        assert not response.wsgi_request.query_recorder.queries
+
+    def test_04_slow_log_without_params(self, client, settings, caplog):
+        settings.SLOW_REQUEST_THRESHOLD = 0
+        settings.SLOW_REQUEST_SAMPLE_RATE = 1
+        with caplog.at_level(logging.WARNING, logger='api.slow'):
+            client.post('/api/v1/auth/signup/', data={
+                'username': 'slow_user', 'email': 'slow_user@yamdb.fake'
+            })
+        message = '\n'.join(
+            record.getMessage() for record in caplog.records
+            if record.name == 'api.slow'
+        )
+        assert 'INSERT INTO "reviews_user"' in message
+        user = User.objects.get(username='slow_user')
+        assert user.confirmation_code not in message, (
+            'Проверьте, что в лог медленных запросов не попадают '
+            'параметры SQL, например код подтверждения.'
+        )
+        assert user.email not in message
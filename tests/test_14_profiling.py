@@ -0,0 +1,49 @@
+from http import HTTPStatus
+
+import pytest
+from api import profiling
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14Profiling:
+    URL = '/api/v1/titles/'
+
+    def test_01_admin_gets_profile(self, admin_client):
+        response = admin_client.get(self.URL, {'_profile': 'cprofile'})
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/plain')
+        assert response['X-Profiled-Status'] == '200'
+        assert 'cumulative' in response.content.decode(), (
+            'Проверьте, что `?_profile=cprofile` возвращает отчёт cProfile.'
+        )
+
+    def test_02_collapsed_and_tracemalloc(self, admin_client):
+        response = admin_client.get(self.URL, {'_profile': 'collapsed'})
+        assert response.status_code == HTTPStatus.OK
+        for line in response.content.decode().splitlines():
+            stack, count = line.rsplit(' ', 1)
+            assert int(count) > 0 and stack, (
+                'Проверьте, что `?_profile=collapsed` возвращает стеки в '
+                'формате `a;b;c число`.'
+            )
+        response = admin_client.get(self.URL, {'_profile': 'tracemalloc'})
+        assert 'Пик памяти' in response.content.decode()
+
+    def test_03_not_admin_gets_normal_response(self, client, user_client):
+        for api_client in (client, user_client):
+            response = api_client.get(self.URL, {'_profile': 'cprofile'})
+            assert response.status_code == HTTPStatus.OK
+            assert 'results' in response.json(), (
+                'Проверьте, что профилирование доступно только '
+                'администратору.'
+            )
+
+    def test_04_concurrent_tracemalloc(self, admin_client):
+        with profiling.tracemalloc_lock:
+            response = admin_client.get(self.URL, {'_profile': 'tracemalloc'})
+        assert response.status_code == HTTPStatus.CONFLICT, (
+            'Проверьте, что одновременный `?_profile=tracemalloc` '
+            'отклоняется, а не сбивает текущий замер.'
+        )
+        response = admin_client.get(self.URL, {'_profile': 'tracemalloc'})
+        assert 'Пик памяти' in response.content.decode()
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from api import db
+from django.db import OperationalError, connection
+
+from tests.conftest import MANAGE_PATH
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15DatabaseSettings:
+
+    def test_01_sqlite_pragmas(self, settings):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            assert cursor.fetchone()[0] == 1, (
+                'Проверьте, что для соединений SQLite выполняется '
+                '`PRAGMA synchronous = NORMAL`.'
+            )
+            cursor.execute('PRAGMA busy_timeout')
+            assert cursor.fetchone()[0] == (
+                settings.SQLITE_PRAGMAS['busy_timeout']
+            )
+
+    def test_02_retry_on_lock(self, monkeypatch):
+        monkeypatch.setattr(db.time, 'sleep', lambda delay: None)
+        calls = []
+
+        @db.retry_on_lock
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        assert write() == 'ok' and len(calls) == 3, (
+            'Проверьте, что запись повторяется при `database is locked`.'
+        )
+
+        @db.retry_on_lock(atomic=False)
+        def broken():
+            calls.append(1)
+            raise OperationalError('no such table')
+
+        calls.clear()
+        with pytest.raises(OperationalError):
+            broken()
+        assert len(calls) == 1
+
+    def test_03_production_requires_secret_key(self):
+        env = dict(os.environ, DJANGO_ENV='production')
+        env.pop('DJANGO_SECRET_KEY', None)
+        result = subprocess.run(
+            (sys.executable, '-c', 'import api_yamdb.settings'),
+            cwd=MANAGE_PATH, env=env, capture_output=True, text=True
+        )
+        assert 'DJANGO_SECRET_KEY' in result.stderr, (
+            'Проверьте, что в production без DJANGO_SECRET_KEY настройки '
+            'не загружаются.'
+        )
+        env['DJANGO_SECRET_KEY'] = 'secret'
+        result = subprocess.run(
+            (sys.executable, '-c',
+             'from api_yamdb import settings; '
+             'print(settings.DEBUG, settings.DATABASES["default"]'
+             '["CONN_MAX_AGE"])'),
+            cwd=MANAGE_PATH, env=env, capture_output=True, text=True
+        )
+        assert result.stdout.split() == ['False', '600']
@@ -0,0 +1,64 @@
+from http import HTTPStatus
+
+import pytest
+from api import routers
+from api.views import CategoryViewSet
+from reviews.models import Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16ReadReplicas:
+
+    @pytest.fixture
+    def replica_reads(self, monkeypatch):
+        reads = []
+
+        def choose_replica():
+            reads.append(1)
+            return 'default'
+
+        monkeypatch.setattr(routers, 'choose_replica', choose_replica)
+        return reads
+
+    def test_01_router(self, settings):
+        settings.DATABASE_REPLICAS = ['replica1']
+        router = routers.ReplicaRouter()
+        assert router.db_for_read(Title) is None
+        with routers.read_from_replica():
+            assert router.db_for_read(Title) == 'replica1', (
+                'Проверьте, что чтение в `read_from_replica()` идёт с реплики.'
+            )
+            assert router.db_for_write(Title) == 'default'
+        assert router.allow_migrate('replica1', 'reviews') is False
+
+    def test_02_reads_go_to_replica(self, client, user_client,
+                                    replica_reads):
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        assert replica_reads, (
+            'Проверьте, что чтение списка произведений идёт с реплики.'
+        )
+        replica_reads.clear()
+        user_client.get('/api/v1/users/me/')
+        assert not replica_reads
+
+    def test_03_read_your_writes(self, admin_client, replica_reads,
+                                 monkeypatch):
+        # Список категорий из api.catalog не обращается к БД.
+        monkeypatch.setattr(CategoryViewSet, 'catalog', None)
+        response = admin_client.post(
+            '/api/v1/categories/', data={'name': 'Фильм', 'slug': 'movie'}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert 'yamdb_primary' in response.cookies, (
+            'Проверьте, что после записи клиент закрепляется за основной БД.'
+        )
+        replica_reads.clear()
+        response = admin_client.get('/api/v1/categories/')
+        assert response.json()['count'] == 1
+        assert not replica_reads, (
+            'Проверьте, что после записи чтение клиента идёт с основной БД.'
+        )
+        admin_client.cookies.clear()
+        admin_client.get('/api/v1/categories/')
+        assert replica_reads
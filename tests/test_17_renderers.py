@@ -0,0 +1,65 @@
+import io
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from api import renderers
+from api.renderers import FastJSONParser, FastJSONRenderer
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+SAMPLE = {
+    'count': 2,
+    'results': [
+        {
+            'name': 'Произведение\u2028с разделителем\u2029строк',
+            'year': 2000,
+            'rating': 7.5,
+            'price': Decimal('10.25'),
+            'published': datetime(2023, 5, 1, 12, 30, 15, 123456,
+                                  tzinfo=timezone.utc),
+            'day': date(2023, 5, 1),
+            'genre': ({'slug': 'drama'},),
+            'note': gettext_lazy('Это поле обязательно.'),
+            'big': 2 ** 70,
+        },
+        {1: None, 'flag': True},
+    ],
+}
+
+
+class Test17Renderers:
+
+    def test_01_renderer_matches_drf(self):
+        assert renderers.orjson is not None
+        assert FastJSONRenderer().render(SAMPLE) == (
+            JSONRenderer().render(SAMPLE)
+        ), (
+            'Проверьте, что `FastJSONRenderer` отдаёт те же байты, что и '
+            'JSONRenderer из DRF.'
+        )
+        data = dict(SAMPLE, results=SAMPLE['results'][:1])
+        data['results'][0] = dict(data['results'][0], big=1)
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_02_stdlib_fallback(self, monkeypatch):
+        monkeypatch.setattr(renderers, 'orjson', None)
+        assert FastJSONRenderer().render(SAMPLE) == (
+            JSONRenderer().render(SAMPLE)
+        )
+
+    def test_03_parser(self):
+        parser = FastJSONParser()
+        assert parser.parse(
+            io.BytesIO('{"name": "Фильм", "score": 5}'.encode())
+        ) == {'name': 'Фильм', 'score': 5}
+        with pytest.raises(ParseError):
+            parser.parse(io.BytesIO(b'{"name": NaN}'))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_api_uses_fast_renderer(self, client):
+        response = client.get('/api/v1/categories/')
+        assert isinstance(
+            response.accepted_renderer, FastJSONRenderer
+        ), 'Проверьте, что `FastJSONRenderer` используется по умолчанию.'
@@ -0,0 +1,61 @@
+import pytest
+from api.views import CommentViewSet, ReviewViewSet, TitleViewSet
+from reviews.models import Category, Comment, Genre, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18ValuesReaders:
+
+    def create_data(self, django_user_model):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        genres = [
+            Genre.objects.create(name=name, slug=slug)
+            for name, slug in (('Драма', 'drama'), ('Комедия', 'comedy'),
+                               ('Вестерн', 'western'))
+        ]
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'very_long_username_{number}',
+                email=f'author{number}@yamdb.fake'
+            ) for number in range(3)
+        ]
+        titles = [
+            Title.objects.create(
+                name='Без категории', year=1999,
+                description='Описание с "кавычками"'
+            ),
+            Title.objects.create(name='Фильм', year=2020, category=category),
+            Title.objects.create(name='Без жанров', year=2001,
+                                 category=category),
+        ]
+        titles[0].genre.set(genres)
+        titles[1].genre.set(genres[:1])
+        for score, author in zip((7, 8, 10), authors):
+            review = Review.objects.create(
+                title=titles[1], author=author, text='Отзыв', score=score
+            )
+        for author in authors:
+            Comment.objects.create(
+                review=review, author=author, text='Комментарий'
+            )
+        return titles[1], review
+
+    def test_01_parity_with_serializers(self, client, django_user_model,
+                                        monkeypatch):
+        title, review = self.create_data(django_user_model)
+        cases = (
+            (TitleViewSet, '/api/v1/titles/'),
+            (TitleViewSet, '/api/v1/titles/?genre=drama&limit=1&offset=1'),
+            (ReviewViewSet, f'/api/v1/titles/{title.id}/reviews/'),
+            (CommentViewSet,
+             f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'),
+        )
+        for view, url in cases:
+            fast = client.get(url).content
+            with monkeypatch.context() as patch:
+                patch.setattr(view, 'values_reader', None)
+                slow = client.get(url).content
+            assert fast == slow, (
+                f'Проверьте, что быстрый список `{url}` побайтно совпадает '
+                'с ответом сериализатора.'
+            )
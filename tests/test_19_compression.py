@@ -0,0 +1,74 @@
+import gzip
+from http import HTTPStatus
+
+import pytest
+from api.compression import choose_encoding
+from api.middleware import CompressionMiddleware
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory
+from reviews.models import Category, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19Compression:
+    URL = '/api/v1/titles/?limit=50'
+
+    def create_titles(self):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        Title.objects.bulk_create(
+            Title(
+                name=f'Произведение {number}', year=2000,
+                category=category, description='Описание ' * 20
+            ) for number in range(50)
+        )
+
+    def test_01_gzip_and_etag(self, client):
+        self.create_titles()
+        plain = client.get(self.URL)
+        response = client.get(self.URL, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Encoding'] == 'gzip', (
+            'Проверьте, что большие ответы сжимаются gzip.'
+        )
+        assert gzip.decompress(response.content) == plain.content
+        assert 'Accept-Encoding' in response['Vary']
+        assert response['ETag'] == f'W/{plain["ETag"]}', (
+            'Проверьте, что у сжатого ответа ETag становится слабым.'
+        )
+        not_modified = client.get(
+            self.URL, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        assert not_modified.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что ETag сжатого ответа подходит для If-None-Match.'
+        )
+
+    def test_02_small_response_is_not_compressed(self, client):
+        response = client.get(
+            '/api/v1/categories/', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        assert not response.has_header('Content-Encoding')
+
+    def test_03_streaming_response(self):
+        chunks = [f'{number},строка\n'.encode() for number in range(1000)]
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(
+                iter(chunks), content_type='text/csv'
+            )
+        )
+        response = middleware(
+            RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        )
+        assert response['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(
+            b''.join(response.streaming_content)
+        ) == b''.join(chunks), (
+            'Проверьте, что потоковые ответы сжимаются по мере отдачи.'
+        )
+
+    def test_04_choose_encoding(self):
+        assert choose_encoding('') is None
+        assert choose_encoding('identity') is None
+        assert choose_encoding('gzip;q=0') is None
+        assert choose_encoding('deflate, gzip;q=0.5') == 'gzip'
+        assert choose_encoding('*') is not None
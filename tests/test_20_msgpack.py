@@ -0,0 +1,82 @@
+import io
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from http import HTTPStatus
+
+import msgpack
+import pytest
+from api.renderers import MessagePackParser, MessagePackRenderer
+from reviews.models import Category, Genre, Review, Title
+from rest_framework.exceptions import ParseError
+
+MSGPACK = 'application/msgpack'
+
+
+class Test20MessagePack:
+
+    def test_01_renderer_matches_json_types(self):
+        data = {
+            'price': Decimal('10.25'),
+            'published': datetime(2023, 5, 1, 12, 30, tzinfo=timezone.utc),
+            'genre': ({'slug': 'drama'},),
+        }
+        assert msgpack.unpackb(MessagePackRenderer().render(data)) == {
+            'price': 10.25,
+            'published': '2023-05-01T12:30:00Z',
+            'genre': [{'slug': 'drama'}],
+        }, (
+            'Проверьте, что `MessagePackRenderer` кодирует даты и Decimal '
+            'так же, как JSON.'
+        )
+
+    def test_02_parser(self):
+        parser = MessagePackParser()
+        assert parser.parse(
+            io.BytesIO(msgpack.packb({'name': 'Фильм', 'score': 5}))
+        ) == {'name': 'Фильм', 'score': 5}
+        with pytest.raises(ParseError):
+            parser.parse(io.BytesIO(b'\xc1'))
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_accept_negotiation(self, client, admin):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        title = Title.objects.create(name='Фильм', year=2020,
+                                     category=category)
+        title.genre.set([genre])
+        Review.objects.create(title=title, author=admin, text='Отзыв',
+                              score=8)
+        for url in ('/api/v1/titles/', f'/api/v1/titles/{title.id}/',
+                    f'/api/v1/titles/{title.id}/reviews/'):
+            response = client.get(url, HTTP_ACCEPT=MSGPACK)
+            assert response.status_code == HTTPStatus.OK
+            assert response['Content-Type'] == MSGPACK, (
+                f'Проверьте, что `{url}` отдаёт MessagePack по заголовку '
+                '`Accept`.'
+            )
+            assert msgpack.unpackb(response.content) == json.loads(
+                client.get(url).content
+            ), (
+                f'Проверьте, что MessagePack и JSON ответы `{url}` '
+                'содержат одинаковые данные.'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_content_type_negotiation(self, admin_client):
+        response = admin_client.post(
+            '/api/v1/categories/',
+            data=msgpack.packb({'name': 'Книга', 'slug': 'book'}),
+            content_type=MSGPACK, HTTP_ACCEPT=MSGPACK
+        )
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что API принимает тело с `Content-Type: '
+            'application/msgpack`.'
+        )
+        assert msgpack.unpackb(response.content) == {
+            'name': 'Книга', 'slug': 'book'
+        }
+        response = admin_client.post(
+            '/api/v1/categories/', data=b'\xc1', content_type=MSGPACK
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+
+import pytest
+from api import asgi
+from api.views import TitleViewSet
+from asgiref.sync import async_to_sync
+from reviews.models import Category, Genre, Title
+
+
+async def asgi_request(path, method='GET', query='', headers=(),
+                       body=b''):
+    messages = []
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi.AsyncReadASGIHandler()(scope, receive, send)
+    return messages[0]['status'], b''.join(
+        message.get('body', b'') for message in messages[1:]
+    )
+
+
+def asgi_get(path, method='GET', query='', headers=()):
+    return async_to_sync(asgi_request)(path, method, query, headers)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21ASGI:
+
+    @pytest.fixture(autouse=True)
+    def read_threads(self, monkeypatch):
+        threads = []
+        run_read = asgi.run_read
+
+        def spy(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return run_read(*args, **kwargs)
+
+        monkeypatch.setattr(asgi, 'run_read', spy)
+        yield threads
+        asgi.shutdown_executors()
+
+    def create_titles(self):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        genre = Genre.objects.create(name='Драма', slug='drama')
+        for number in range(3):
+            title = Title.objects.create(
+                name=f'Фильм {number}', year=2000 + number,
+                category=category
+            )
+            title.genre.set([genre])
+        return title
+
+    def test_01_reads_run_in_pool(self, client, read_threads):
+        title = self.create_titles()
+        for path in ('/api/v1/titles/', f'/api/v1/titles/{title.id}/',
+                     '/api/v1/categories/', '/api/v1/genres/',
+                     f'/api/v1/titles/{title.id}/reviews/'):
+            status, body = asgi_get(path)
+            assert status == HTTPStatus.OK
+            assert body == client.get(path).content, (
+                f'Проверьте, что под ASGI `{path}` отдаёт тот же ответ, '
+                'что и под WSGI.'
+            )
+        assert len(read_threads) == 5 and all(
+            name.startswith('api-read') for name in read_threads
+        ), 'Проверьте, что чтение под ASGI выполняется в пуле потоков.'
+
+    def test_02_pagination_and_permissions(self, read_threads):
+        self.create_titles()
+        status, body = asgi_get('/api/v1/titles/', query='limit=1')
+        assert status == HTTPStatus.OK
+        assert b'"count":3' in body and body.count(b'"year"') == 1, (
+            'Проверьте, что под ASGI сохраняется пагинация.'
+        )
+        assert asgi_get('/api/v1/categories/', method='POST')[0] == (
+            HTTPStatus.UNAUTHORIZED
+        )
+        assert asgi_get('/api/v1/users/')[0] == HTTPStatus.UNAUTHORIZED
+        assert len(read_threads) == 1, (
+            'Проверьте, что запись и представления без async_reads '
+            'не выполняются в пуле чтения.'
+        )
+
+    def test_03_queries_are_counted(self, monkeypatch):
+        self.create_titles()
+        monkeypatch.setattr(TitleViewSet, 'query_budget', {'list': 0})
+        status, _ = asgi_get('/api/v1/titles/')
+        assert status == HTTPStatus.INTERNAL_SERVER_ERROR, (
+            'Проверьте, что SQL-запросы из пула потоков учитываются '
+            'в query_budget.'
+        )
+
+    def test_04_profiling(self, token_admin):
+        self.create_titles()
+        status, body = asgi_get(
+            '/api/v1/titles/', query='_profile=tracemalloc',
+            headers=((b'authorization',
+                      f'Bearer {token_admin["access"]}'.encode()),)
+        )
+        assert status == HTTPStatus.OK
+        assert 'Пик памяти' in body.decode(), (
+            'Проверьте, что `?_profile=` работает под ASGI.'
+        )
+
+    def test_05_concurrent_queries_are_counted_per_request(
+        self, django_user_model
+    ):
+        self.create_titles()
+        django_user_model.objects.create_user(
+            username='reader', email='reader@yamdb.fake'
+        )
+        body = json.dumps(
+            {'username': 'reader', 'confirmation_code': 'wrong'}
+        ).encode()
+
+        async def run():
+            return await asyncio.gather(*(
+                asgi_request('/api/v1/titles/') for _ in range(40)
+            ), *(
+                asgi_request(
+                    '/api/v1/auth/token/', method='POST', body=body,
+                    headers=((b'content-type', b'application/json'),
+                             (b'content-length', str(len(body)).encode()))
+                ) for _ in range(40)
+            ))
+
+        statuses = [status for status, _ in async_to_sync(run)()]
+        assert statuses == (
+            [HTTPStatus.OK] * 40 + [HTTPStatus.BAD_REQUEST] * 40
+        ), (
+            'Проверьте, что под ASGI SQL-запросы одновременных запросов '
+            'не попадают в query_budget друг друга.'
+        )
@@ -0,0 +1,175 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from api import events
+from django.db import transaction
+from reviews.models import Title, TitleEvent
+
+from tests.test_21_asgi import asgi_get
+
+
+def read_events(response):
+    """Блоки потока SSE без комментариев keepalive."""
+    body = b''.join(response.streaming_content).decode()
+    result = []
+    for block in body.split('\n\n'):
+        fields = dict(
+            line.split(': ', 1) for line in block.splitlines()
+            if not line.startswith(':')
+        )
+        if 'event' in fields:
+            fields['data'] = json.loads(fields['data'])
+            result.append(fields)
+    return result
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22Events:
+
+    @pytest.fixture(autouse=True)
+    def hub(self, settings, monkeypatch):
+        settings.EVENTS_BACKEND = 'local'
+        settings.EVENTS_MAX_AGE = 0.3
+        settings.EVENTS_KEEPALIVE = 0.1
+        hub = events.EventHub(settings.EVENTS_HISTORY)
+        monkeypatch.setattr(events, 'hub', hub)
+        monkeypatch.setattr(events, 'fanout', None)
+        return hub
+
+    @pytest.fixture
+    def title(self):
+        return Title.objects.create(name='Фильм', year=2020)
+
+    def url(self, title):
+        return f'/api/v1/titles/{title.id}/events/'
+
+    def test_01_review_and_comment_events(
+        self, client, user_client, admin_client, title
+    ):
+        response = client.get(self.url(title))
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/event-stream')
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        review = user_client.post(
+            reviews_url, data={'text': 'Отзыв', 'score': 7}
+        ).json()
+        admin_client.patch(
+            f'{reviews_url}{review["id"]}/', data={'score': 9}
+        )
+        comment = user_client.post(
+            f'{reviews_url}{review["id"]}/comments/',
+            data={'text': 'Комментарий'}
+        ).json()
+        admin_client.delete(f'{reviews_url}{review["id"]}/')
+        received = read_events(response)
+        assert [event['event'] for event in received] == [
+            'review.created', 'review.updated', 'comment.created',
+            'review.deleted',
+        ], (
+            'Проверьте, что `/titles/{id}/events/` передаёт события '
+            'отзывов и комментариев в порядке их записи.'
+        )
+        assert received[0]['data'] == review
+        assert received[1]['data']['score'] == 9
+        assert received[2]['data'] == dict(comment, review_id=review['id'])
+        assert received[3]['data'] == {'id': review['id']}
+
+    def test_02_last_event_id(self, client, title, hub, settings):
+        for number in range(3):
+            events.publish(title.id, 'review.created', {'id': number})
+        events.publish(title.id + 1, 'review.created', {'id': 99})
+        first_id = hub.history[0].id
+        received = read_events(client.get(
+            self.url(title), HTTP_LAST_EVENT_ID=str(first_id)
+        ))
+        assert [event['data']['id'] for event in received] == [1, 2], (
+            'Проверьте, что по `Last-Event-ID` передаются пропущенные '
+            'события этого произведения.'
+        )
+        assert received[-1]['id'] == str(first_id + 2)
+
+        hub.history = type(hub.history)(hub.history, maxlen=1)
+        hub.history.append(hub.history[0])
+        received = read_events(client.get(
+            self.url(title), HTTP_LAST_EVENT_ID=str(first_id)
+        ))
+        assert received and received[0]['event'] == events.RESET, (
+            'Проверьте, что при потере истории клиент получает событие '
+            '`reset`.'
+        )
+
+    def test_03_rollback_publishes_nothing(self, title, hub):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                events.publish(title.id, 'review.created', {'id': 1})
+                raise RuntimeError
+        assert not hub.history, (
+            'Проверьте, что события отменённой транзакции не отправляются.'
+        )
+
+    def test_04_database_fanout(self, settings, title, user_client, hub,
+                                monkeypatch, client):
+        settings.EVENTS_BACKEND = 'database'
+        other_hub = events.EventHub(settings.EVENTS_HISTORY)
+        workers = [
+            events.DatabaseFanout(hub), events.DatabaseFanout(other_hub)
+        ]
+        monkeypatch.setattr(events, 'fanout', workers[0])
+        review = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Отзыв', 'score': 7}
+        ).json()
+        assert TitleEvent.objects.filter(
+            title_id=title.id, type='review.created'
+        ).count() == 1
+        for worker in workers:
+            assert worker.poll() == 1
+        assert [event.id for event in hub.history] == [
+            event.id for event in other_hub.history
+        ] == [TitleEvent.objects.get().id], (
+            'Проверьте, что событие доходит до всех процессов с номером '
+            'из БД.'
+        )
+
+        hub.history.clear()
+        received = read_events(client.get(
+            self.url(title),
+            HTTP_LAST_EVENT_ID=str(TitleEvent.objects.get().id - 1)
+        ))
+        assert [event['data'] for event in received] == [review], (
+            'Проверьте, что при EVENTS_BACKEND = "database" пропущенные '
+            'события читаются из БД.'
+        )
+
+    def test_05_missing_title(self, client):
+        response = client.get('/api/v1/titles/999/events/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert response.content.startswith(b'event: error\n')
+
+    def test_06_asgi_stream(self, title):
+        events.publish(title.id, 'review.created', {'id': 1})
+        status, body = asgi_get(
+            self.url(title), headers=((b'last-event-id', b'0'),)
+        )
+        assert status == HTTPStatus.OK
+        assert body.startswith(b'retry: ') and (
+            b'event: review.created\ndata: {"id":1}' in body
+        ), 'Проверьте, что поток событий работает под ASGI.'
+
+    def test_07_comment_on_other_title(self, user_client, title, hub):
+        other = Title.objects.create(name='Книга', year=2020)
+        review = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Отзыв', 'score': 7}
+        ).json()
+        hub.history.clear()
+        response = user_client.post(
+            f'/api/v1/titles/{other.id}/reviews/{review["id"]}/comments/',
+            data={'text': 'Комментарий'}
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что комментарий нельзя добавить к отзыву через '
+            'url другого произведения.'
+        )
+        assert not hub.history
@@ -0,0 +1,160 @@
+from http import HTTPStatus
+
+import pytest
+from api import catalog
+from api.serializers import CatalogSlugField
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.relations import PKOnlyObject
+from reviews.models import Category, Genre, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23Catalog:
+
+    def create_data(self):
+        Category.objects.create(name='Фильм', slug='movie')
+        for name, slug in (('Драма', 'drama'), ('Комедия', 'comedy'),
+                           ('Вестерн', 'western')):
+            Genre.objects.create(name=name, slug=slug)
+
+    def test_01_list_and_search_without_queries(self, client):
+        self.create_data()
+        client.get('/api/v1/genres/')
+        with CaptureQueriesContext(connection) as queries:
+            names = [
+                [genre['name'] for genre in client.get(
+                    '/api/v1/genres/', {'search': search}
+                ).json()['results']]
+                for search in ('', 'драма', 'WEST', 'ко,ия', 'нет')
+            ]
+        assert names == [
+            ['Вестерн', 'Драма', 'Комедия'], ['Драма'], ['Вестерн'],
+            ['Комедия'], [],
+        ], (
+            'Проверьте, что список и поиск жанров работают как '
+            '`SearchFilter` по `name` и `slug`.'
+        )
+        assert not queries.captured_queries, (
+            'Проверьте, что список и поиск жанров не обращаются к БД, '
+            'пока справочник не изменился.'
+        )
+
+    def test_02_reload_on_version_change(self, client, admin_client):
+        self.create_data()
+        assert client.get('/api/v1/categories/').json()['count'] == 1
+        admin_client.post(
+            '/api/v1/categories/', data={'name': 'Книга', 'slug': 'book'}
+        )
+        assert client.get('/api/v1/categories/').json()['count'] == 2, (
+            'Проверьте, что после создания категории список перечитывается.'
+        )
+
+        # Изменение в другом процессе: строка меняется без сигналов,
+        # о нём известно только по общей версии.
+        Category.objects.filter(slug='book').update(name='Журнал')
+        names = [
+            category['name']
+            for category in client.get('/api/v1/categories/').json()[
+                'results'
+            ]
+        ]
+        assert names == ['Книга', 'Фильм']
+        catalog.categories.version.bump()
+        names = [
+            category['name']
+            for category in client.get('/api/v1/categories/').json()[
+                'results'
+            ]
+        ]
+        assert names == ['Журнал', 'Фильм'], (
+            'Проверьте, что снимок перечитывается при смене общей версии.'
+        )
+
+    def test_03_titles_use_catalog(self, client, admin_client):
+        self.create_data()
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/categories/')
+        with CaptureQueriesContext(connection) as queries:
+            response = admin_client.post('/api/v1/titles/', data={
+                'name': 'Фильм', 'year': 2020, 'category': 'movie',
+                'genre': ['drama', 'western'],
+            })
+            assert response.status_code == HTTPStatus.CREATED
+            title = client.get(
+                f'/api/v1/titles/{response.json()["id"]}/'
+            ).json()
+            client.get('/api/v1/titles/')
+        assert title['category'] == {'name': 'Фильм', 'slug': 'movie'}
+        assert title['genre'] == [
+            {'name': 'Вестерн', 'slug': 'western'},
+            {'name': 'Драма', 'slug': 'drama'},
+        ]
+        assert not [
+            query for query in queries.captured_queries
+            if '"reviews_category"' in query['sql']
+            or 'WHERE "reviews_genre"."slug"' in query['sql']
+        ], (
+            'Проверьте, что slug при записи и названия категорий и жанров '
+            'при чтении произведений берутся из api.catalog.'
+        )
+
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Фильм', 'year': 2020, 'category': 'nope',
+            'genre': ['drama'],
+        })
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'category' in response.json()
+        assert Title.objects.count() == 1
+
+    def test_04_stale_snapshot(self, client, monkeypatch):
+        self.create_data()
+        title = Title.objects.create(name='Фильм', year=2020)
+        title.genre.set(Genre.objects.all())
+        western = Genre.objects.get(slug='western')
+        # Снимок без вестерна: например, жанр удалён после чтения
+        # произведения с реплики.
+        stale = catalog.Snapshot('stale', [
+            (genre.id, genre.name, genre.slug)
+            for genre in Genre.objects.exclude(pk=western.pk)
+        ])
+        monkeypatch.setattr(
+            catalog.genres, 'snapshot', lambda ids=(): stale
+        )
+        for path in ('/api/v1/titles/', f'/api/v1/titles/{title.id}/'):
+            response = client.get(path)
+            assert response.status_code == HTTPStatus.OK, (
+                'Проверьте, что жанр, которого нет в снимке api.catalog, '
+                'не ломает ответ произведений.'
+            )
+        assert [genre['slug'] for genre in response.json()['genre']] == [
+            'drama', 'comedy'
+        ]
+        field = CatalogSlugField(catalog.genres, queryset=Genre.objects)
+        assert field.to_representation(PKOnlyObject(western.pk)) is None
+
+    def test_05_reload_on_unknown_slug(self, client, admin_client):
+        self.create_data()
+        client.get('/api/v1/genres/')
+        # Жанр записан, а версия ещё не сменилась (другой воркер до
+        # on_commit или изменение в обход сигналов).
+        Genre.objects.bulk_create([Genre(name='Нуар', slug='noir')])
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Фильм', 'year': 2020, 'category': 'movie',
+            'genre': ['noir'],
+        })
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что при неизвестном slug справочник '
+            'перечитывается до ответа об ошибке.'
+        )
+
+        Genre.objects.bulk_create([Genre(name='Мюзикл', slug='musical')])
+        title = Title.objects.get()
+        Title.genre.through.objects.bulk_create([Title.genre.through(
+            title_id=title.id, genre_id=Genre.objects.get(slug='musical').id
+        )])
+        response = client.get('/api/v1/titles/', {'genre': 'musical'})
+        assert response.json()['count'] == 1, (
+            'Проверьте, что фильтр по жанру перечитывает справочник при '
+            'неизвестном slug.'
+        )
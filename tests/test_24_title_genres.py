@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Genre, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24TitleGenres:
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture
+    def genres(self):
+        Category.objects.create(name='Фильм', slug='movie')
+        return [
+            Genre.objects.create(name=f'Жанр {number}', slug=f'g{number}')
+            for number in range(8)
+        ]
+
+    def post_title(self, client, genres):
+        return client.post(self.TITLES_URL, data={
+            'name': 'Фильм', 'year': 2020, 'category': 'movie',
+            'genre': genres,
+        })
+
+    def test_01_queries_do_not_depend_on_genres(self, admin_client,
+                                                genres):
+        self.post_title(admin_client, ['g0'])
+        counts = []
+        for slugs in (['g0'], [genre.slug for genre in genres]):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post_title(admin_client, slugs)
+            assert response.status_code == HTTPStatus.CREATED
+            assert response.json()['genre'] == slugs
+            counts.append(len(queries))
+            inserts = [
+                query for query in queries.captured_queries
+                if query['sql'].startswith('INSERT INTO "reviews_title_genre"')
+            ]
+            assert len(inserts) == 1, (
+                'Проверьте, что связи с жанрами вставляются одним запросом.'
+            )
+        assert counts[0] == counts[1], (
+            'Проверьте, что число SQL-запросов при создании произведения '
+            'не зависит от числа жанров.'
+        )
+
+        title_id = response.json()['id']
+        response = admin_client.patch(
+            f'{self.TITLES_URL}{title_id}/', data={'genre': ['g7', 'g1']}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert sorted(Title.objects.get(pk=title_id).genre.values_list(
+            'slug', flat=True
+        )) == ['g1', 'g7'], (
+            'Проверьте, что при изменении жанров лишние связи удаляются.'
+        )
+
+    def test_02_unknown_slugs(self, admin_client, genres):
+        response = self.post_title(admin_client, ['g0', 'nope', 'g1', 'bad'])
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        errors = response.json()['genre']
+        assert len(errors) == 2 and 'nope' in errors[0] and (
+            'bad' in errors[1]
+        ), 'Проверьте, что в ошибке перечислены все неизвестные жанры.'
+        assert not Title.objects.exists()
@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Genre, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25TitleFilters:
+    TITLES_URL = '/api/v1/titles/'
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        book = Category.objects.create(name='Книга', slug='book')
+        Category.objects.create(name='Музыка', slug='music')
+        drama, comedy, western = (
+            Genre.objects.create(name=name, slug=slug)
+            for name, slug in (('Драма', 'drama'), ('Комедия', 'comedy'),
+                               ('Вестерн', 'western'))
+        )
+        for name, category, genres in (
+            ('Драма', movie, (drama,)),
+            ('Комедия', book, (comedy,)),
+            ('Драмеди', movie, (drama, comedy)),
+            ('Вестерн', None, (western,)),
+        ):
+            Title.objects.create(
+                name=name, year=2000, category=category
+            ).genre.set(genres)
+
+    def names(self, client, **params):
+        response = client.get(self.TITLES_URL, params)
+        assert response.status_code == HTTPStatus.OK
+        return sorted(title['name'] for title in response.json()['results'])
+
+    def test_01_genres_any_and_all(self, client):
+        assert self.names(client, genre='drama,comedy') == [
+            'Драма', 'Драмеди', 'Комедия'
+        ], 'Проверьте, что `genre=a,b` возвращает произведения любого жанра.'
+        assert self.names(
+            client, genre='drama,comedy', genre_mode='all'
+        ) == ['Драмеди'], (
+            'Проверьте, что `genre_mode=all` возвращает произведения со '
+            'всеми жанрами.'
+        )
+        assert self.names(client, genre='drama') == ['Драма', 'Драмеди']
+        assert self.names(client, genre='drama,nope') == ['Драма', 'Драмеди']
+        assert self.names(
+            client, genre='drama,nope', genre_mode='all'
+        ) == []
+        response = client.get(self.TITLES_URL, {'genre_mode': 'some'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_02_categories(self, client):
+        assert self.names(client, category='movie,book') == [
+            'Драма', 'Драмеди', 'Комедия'
+        ], 'Проверьте, что `category=a,b` возвращает обе категории.'
+        assert self.names(client, category='music,nope') == []
+        assert self.names(
+            client, category='movie', genre='comedy,western'
+        ) == ['Драмеди']
+
+    def test_03_no_joins_with_dictionaries(self, client):
+        client.get(self.TITLES_URL)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(self.TITLES_URL, {
+                'genre': 'drama,comedy', 'genre_mode': 'all',
+                'category': 'movie',
+            })
+        assert not [
+            query for query in queries.captured_queries
+            if '"reviews_genre"' in query['sql']
+            or '"reviews_category"' in query['sql']
+        ], (
+            'Проверьте, что фильтры по жанрам и категориям не соединяют '
+            'таблицы справочников.'
+        )
@@ -0,0 +1,117 @@
+from http import HTTPStatus
+
+import pytest
+from api import routers
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Category, Genre, Review, Title
+
+FACETS_URL = '/api/v1/titles/facets/'
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26TitleFacets:
+
+    @pytest.fixture(autouse=True)
+    def titles(self, django_user_model):
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        book = Category.objects.create(name='Книга', slug='book')
+        drama, comedy = (
+            Genre.objects.create(name=name, slug=slug)
+            for name, slug in (('Драма', 'drama'), ('Комедия', 'comedy'))
+        )
+        author = django_user_model.objects.create_user(
+            username='author', email='author@yamdb.fake'
+        )
+        titles = []
+        for name, year, category, genres, score in (
+            ('Драма', 1994, movie, (drama,), 10),
+            ('Драмеди', 1999, movie, (drama, comedy), 7),
+            ('Комедия', 2005, book, (comedy,), 3),
+            ('Без отзывов', 2010, None, (), None),
+        ):
+            title = Title.objects.create(
+                name=name, year=year, category=category
+            )
+            title.genre.set(genres)
+            if score is not None:
+                Review.objects.create(
+                    title=title, author=author, text='Отзыв', score=score
+                )
+            titles.append(title)
+        return titles
+
+    def bands(self, facets):
+        return {band['min']: band['count'] for band in facets['rating']}
+
+    def test_01_counts(self, client):
+        response = client.get(FACETS_URL)
+        assert response.status_code == HTTPStatus.OK
+        facets = response.json()
+        assert facets['count'] == 4
+        assert facets['genre'] == [
+            {'name': 'Драма', 'slug': 'drama', 'count': 2},
+            {'name': 'Комедия', 'slug': 'comedy', 'count': 2},
+        ], 'Проверьте счётчики жанров в `/titles/facets/`.'
+        assert facets['category'] == [
+            {'name': 'Книга', 'slug': 'book', 'count': 1},
+            {'name': 'Фильм', 'slug': 'movie', 'count': 2},
+        ]
+        assert facets['decade'] == [
+            {'decade': 1990, 'count': 2}, {'decade': 2000, 'count': 1},
+            {'decade': 2010, 'count': 1},
+        ]
+        assert self.bands(facets) == {1: 0, 3: 1, 5: 0, 7: 1, 9: 1}
+        assert facets['unrated'] == 1
+
+        facets = client.get(
+            FACETS_URL, {'genre': 'drama,comedy', 'genre_mode': 'all'}
+        ).json()
+        assert facets['count'] == 1 and facets['category'] == [
+            {'name': 'Фильм', 'slug': 'movie', 'count': 1},
+        ], (
+            'Проверьте, что `/titles/facets/` учитывает параметры '
+            'фильтра списка произведений.'
+        )
+        assert client.get(
+            FACETS_URL, {'genre_mode': 'some'}
+        ).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_02_fixed_queries_and_cache(self, client, user_client, titles):
+        client.get('/api/v1/titles/')
+        with CaptureQueriesContext(connection) as queries:
+            facets = client.get(FACETS_URL, {'year': 1994}).json()
+        assert facets['count'] == 1
+        assert len(queries) == 4, (
+            'Проверьте, что счётчики считаются четырьмя '
+            'сгруппированными запросами.'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            client.get(FACETS_URL, {'year': 1994, 'format': 'json'})
+        assert not queries.captured_queries, (
+            'Проверьте, что результат `/titles/facets/` кэшируется.'
+        )
+
+        user_client.post(
+            f'/api/v1/titles/{titles[3].id}/reviews/',
+            data={'text': 'Отзыв', 'score': 1}
+        )
+        facets = client.get(FACETS_URL).json()
+        assert facets['unrated'] == 0 and self.bands(facets)[1] == 1, (
+            'Проверьте, что кэш `/titles/facets/` сбрасывается после '
+            'нового отзыва.'
+        )
+
+    def test_03_counts_read_primary(self, client, monkeypatch):
+        replica_reads = []
+
+        def choose_replica():
+            replica_reads.append(1)
+            return 'default'
+
+        monkeypatch.setattr(routers, 'choose_replica', choose_replica)
+        assert client.get(FACETS_URL, {'year': 1999}).json()['count'] == 1
+        assert not replica_reads, (
+            'Проверьте, что кэшируемые счётчики `/titles/facets/` '
+            'считаются по основной БД.'
+        )